@@ -0,0 +1,330 @@
+# app/api/main.py
+"""
+HTTP API over the service layer.
+
+  POST /coverage/query     CoverageQuery  -> check_coverage
+  POST /claims/evaluate    ClaimQuery     -> evaluate_claim
+  POST /retrieve           RetrieveQuery  -> retrieve_chunks (as citations)
+  POST /upgrades/suggest   UpgradeQuery   -> suggest_alternative_plans
+  GET  /customers/<id>                    -> get_customer
+
+Each POST route has a /batch twin taking {"items": [...]} (customers:
+POST /customers/batch with {"ids": [...]}) and answering {"results": [...]}
+in input order; a failed item becomes {"error": ..., "status": ...} rather
+than failing the whole batch.
+
+All work runs on a bounded WorkerPool. When it is full the API answers 429
+with Retry-After; requests that outlive their timeout (X-Request-Timeout
+header, capped by HOMESHIELD_API_TIMEOUT_S) answer 504. Connections are
+served by werkzeug's threaded server, which starts a thread per connection
+and closes each connection after its response (werkzeug >= 2.1 disables
+keep-alive): at most HOMESHIELD_API_CONNECTIONS (twice the pool capacity)
+are served at once, further connections get a 429, and clients that stall
+while sending a request are dropped after HOMESHIELD_API_READ_TIMEOUT_S
+(15). Single requests call the LLM at "interactive" priority
+and batch items at "background" (see app.scheduler); shed work answers 429.
+
+Environment: HOMESHIELD_API_WORKERS (8), HOMESHIELD_API_QUEUE (32),
+HOMESHIELD_API_TIMEOUT_S (30), HOMESHIELD_API_MAX_BATCH (64, capped at
+workers + queue; larger batches answer 413),
+HOMESHIELD_API_HOST (127.0.0.1), HOMESHIELD_API_PORT (8000).
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from .. import scheduler, telemetry
+from ..schemas import ClaimQuery, CoverageQuery, PolicyScope, RetrieveQuery, UpgradeQuery
+from ..services.customers import CustomerNotFound
+from .pool import Overloaded, WorkerPool
+
+log = logging.getLogger(__name__)
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def default_services() -> Dict[str, Callable[..., Any]]:
+    """The real service functions, imported on first use."""
+    from ..services.claims import evaluate_claim
+    from ..services.coverage import check_coverage
+    from ..services.customers import get_customer
+    from ..services.rag import format_citations, retrieve_chunks
+    from ..services.upgrades import suggest_alternative_plans
+
+    def retrieve(*args, **kwargs):
+        return format_citations(retrieve_chunks(*args, **kwargs))
+
+    return {
+        "check_coverage": check_coverage,
+        "evaluate_claim": evaluate_claim,
+        "retrieve_chunks": retrieve,
+        "get_customer": get_customer,
+        "suggest_alternative_plans": suggest_alternative_plans,
+    }
+
+
+def create_app(services: Optional[Dict[str, Callable[..., Any]]] = None,
+               workers: Optional[int] = None,
+               queue: Optional[int] = None,
+               timeout_s: Optional[float] = None):
+    from flask import Flask, Response, jsonify, request
+
+    svc = services or default_services()
+    pool = WorkerPool(
+        workers or int(_env_num("HOMESHIELD_API_WORKERS", 8)),
+        queue if queue is not None else int(_env_num("HOMESHIELD_API_QUEUE", 32)),
+    )
+    max_timeout = timeout_s or _env_num("HOMESHIELD_API_TIMEOUT_S", 30)
+    # a batch is admitted all or nothing, so one bigger than the pool could never run
+    max_batch = min(int(_env_num("HOMESHIELD_API_MAX_BATCH", 64)), pool.capacity)
+
+    app = Flask(__name__)
+    app.extensions["homeshield_pool"] = pool
+
+    # ---------------------------------------------------------- operations --
+
+    def scope(q: PolicyScope) -> Dict[str, Any]:
+        if q.customer_id:
+            cust = svc["get_customer"](q.customer_id)
+            return {"plan": cust["plan"], "state": cust["state"],
+                    "year": cust["effective_year"], "policy_file": cust.get("policy_file")}
+        return {"plan": q.plan.title(), "state": q.state, "year": q.effective_year, "policy_file": None}
+
+    def coverage(q: CoverageQuery):
+        s = scope(q)
+        return svc["check_coverage"](q.question, s["plan"], s["state"], s["year"], k=q.k)
+
+    def claim(q: ClaimQuery):
+        s = scope(q)
+        return svc["evaluate_claim"](q.issue_description, s["plan"], s["state"], s["year"])
+
+    def retrieve(q: RetrieveQuery):
+        s = scope(q)
+        chunks = svc["retrieve_chunks"](q.query, s["plan"], s["state"], s["year"], k=q.k,
+                                        policy_source=q.policy_source or s["policy_file"])
+        return {"chunks": chunks}
+
+    def upgrade(q: UpgradeQuery):
+        s = scope(q)
+        return {"plans": svc["suggest_alternative_plans"](q.issue, s["plan"], s["state"], s["year"], limit=q.limit)}
+
+    OPS: Dict[str, Tuple[Optional[type[BaseModel]], Callable[[Any], Any]]] = {
+        "coverage": (CoverageQuery, coverage),
+        "claim": (ClaimQuery, claim),
+        "retrieve": (RetrieveQuery, retrieve),
+        "upgrade": (UpgradeQuery, upgrade),
+        "customer": (None, lambda cid: svc["get_customer"](str(cid))),
+    }
+
+    def parse(op: str, payload: Any):
+        model = OPS[op][0]
+        if model is None:
+            return payload
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object.")
+        return model.model_validate(payload)
+
+    def call(op: str, parsed: Any, cls: str, timeout: float) -> Tuple[int, Any]:
+        """Runs on a worker; never raises."""
+        try:
+            with telemetry.request(f"api.{op}"), scheduler.priority(cls, timeout_s=timeout):
+                return 200, OPS[op][1](parsed)
+        except scheduler.Shed as e:
+            return 429, {"error": str(e)}
+        except scheduler.DeadlineExceeded:
+            return 504, {"error": "Timed out."}
+        except CustomerNotFound as e:
+            return 404, {"error": str(e.args[0]) if e.args else "Not found"}
+        except Exception as e:
+            log.exception("api.%s failed", op)
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    def request_timeout() -> float:
+        try:
+            t = float(request.headers.get("X-Request-Timeout", max_timeout))
+        except ValueError:
+            t = max_timeout
+        return max(0.001, min(t, max_timeout))
+
+    def overloaded():
+        resp = jsonify(error="Server busy, retry shortly.")
+        resp.status_code = 429
+        resp.headers["Retry-After"] = "1"
+        return resp
+
+    def single(op: str, payload: Any):
+        try:
+            parsed = parse(op, payload)
+        except (ValidationError, ValueError) as e:
+            return jsonify(error=str(e)), 400
+        try:
+            pool.admit()
+        except Overloaded:
+            return overloaded()
+        timeout = request_timeout()
+        fut = pool.submit(call, op, parsed, "interactive", timeout)
+        try:
+            status, body = fut.result(timeout=timeout)
+        except FuturesTimeout:
+            fut.cancel()
+            return jsonify(error="Timed out."), 504
+        return jsonify(body), status
+
+    def batch(op: str, items: Any):
+        if not isinstance(items, list) or not items:
+            return jsonify(error="Expected a non-empty list."), 400
+        if len(items) > max_batch:
+            return jsonify(error=f"At most {max_batch} items per batch."), 413
+
+        results: list = [None] * len(items)
+        jobs = []
+        for i, item in enumerate(items):
+            try:
+                jobs.append((i, parse(op, item)))
+            except (ValidationError, ValueError) as e:
+                results[i] = {"error": str(e), "status": 400}
+        if jobs:
+            try:
+                pool.admit(len(jobs))
+            except Overloaded:
+                return overloaded()
+            # batches yield shared LLM capacity to single requests
+            timeout = request_timeout()
+            futs = [(i, pool.submit(call, op, parsed, "background", timeout)) for i, parsed in jobs]
+            deadline = time.monotonic() + timeout
+            for i, fut in futs:
+                try:
+                    status, body = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FuturesTimeout:
+                    fut.cancel()
+                    status, body = 504, {"error": "Timed out."}
+                results[i] = body if status == 200 else {**body, "status": status}
+        return jsonify(results=results)
+
+    def body() -> Dict[str, Any]:
+        data = request.get_json(silent=True)
+        return data if isinstance(data, dict) else {}
+
+    # -------------------------------------------------------------- routes --
+
+    @app.post("/coverage/query")
+    def coverage_query():
+        return single("coverage", request.get_json(silent=True))
+
+    @app.post("/coverage/query/batch")
+    def coverage_query_batch():
+        return batch("coverage", body().get("items"))
+
+    @app.post("/claims/evaluate")
+    def claims_evaluate():
+        return single("claim", request.get_json(silent=True))
+
+    @app.post("/claims/evaluate/batch")
+    def claims_evaluate_batch():
+        return batch("claim", body().get("items"))
+
+    @app.post("/retrieve")
+    def retrieve_route():
+        return single("retrieve", request.get_json(silent=True))
+
+    @app.post("/retrieve/batch")
+    def retrieve_batch():
+        return batch("retrieve", body().get("items"))
+
+    @app.post("/upgrades/suggest")
+    def upgrades_suggest():
+        return single("upgrade", request.get_json(silent=True))
+
+    @app.post("/upgrades/suggest/batch")
+    def upgrades_suggest_batch():
+        return batch("upgrade", body().get("items"))
+
+    @app.get("/customers/<customer_id>")
+    def customer(customer_id: str):
+        return single("customer", customer_id)
+
+    @app.post("/customers/batch")
+    def customers_batch():
+        return batch("customer", body().get("ids"))
+
+    @app.get("/healthz")
+    def healthz():
+        return jsonify(status="ok", pending=pool.pending(), capacity=pool.capacity,
+                       rejected=pool.rejected)
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(telemetry.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+BUSY = (b"HTTP/1.1 429 Too Many Requests\r\nRetry-After: 1\r\nContent-Length: 0\r\n"
+        b"Connection: close\r\n\r\n")
+
+
+def make_server(app, host: str, port: int, max_connections: Optional[int] = None,
+                read_timeout_s: Optional[float] = None):
+    """Threaded werkzeug server. Each connection holds a thread until its
+    response is sent, so at most `max_connections` are served at once; the
+    WorkerPool only bounds the work those threads hand it."""
+    from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+    pool = app.extensions.get("homeshield_pool")
+    limit = max_connections or int(_env_num("HOMESHIELD_API_CONNECTIONS", 2 * pool.capacity if pool else 64))
+    slots = threading.BoundedSemaphore(limit)
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = read_timeout_s or _env_num("HOMESHIELD_API_READ_TIMEOUT_S", 15)  # per socket read
+
+    class BoundedServer(ThreadedWSGIServer):
+        def process_request(self, request, client_address):
+            if not slots.acquire(blocking=False):
+                try:
+                    request.sendall(BUSY)
+                except OSError:
+                    pass
+                self.shutdown_request(request)
+                return
+            try:
+                super().process_request(request, client_address)
+            except BaseException:
+                slots.release()
+                raise
+
+        def process_request_thread(self, request, client_address):
+            try:
+                super().process_request_thread(request, client_address)
+            finally:
+                slots.release()
+
+    return BoundedServer(host, port, app, handler=Handler)
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None) -> None:
+    from .. import config  # noqa: F401  (loads .env)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    host = host or os.getenv("HOMESHIELD_API_HOST", "127.0.0.1")
+    port = port or int(_env_num("HOMESHIELD_API_PORT", 8000))
+    server = make_server(create_app(), host, port)
+    log.info("HomeShield API on http://%s:%d", host, server.server_port)
+    try:
+        server.serve_forever()
+    finally:
+        server.app.extensions["homeshield_pool"].shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    serve()
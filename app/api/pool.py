@@ -0,0 +1,51 @@
+# app/api/pool.py
+"""
+Bounded worker pool with admission control.
+
+At most `workers` jobs run at once and at most `queue` more wait for a
+worker; anything beyond that is refused up front (the API turns that into a
+429) instead of piling up behind a slow upstream.
+"""
+from __future__ import annotations
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class Overloaded(Exception):
+    """Raised when the pool has no room for more work."""
+
+
+class WorkerPool:
+    def __init__(self, workers: int = 8, queue: int = 32) -> None:
+        self.workers = max(1, int(workers))
+        self.capacity = self.workers + max(0, int(queue))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hs-api")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def admit(self, n: int = 1) -> None:
+        """Reserve room for n jobs, all or nothing."""
+        with self._lock:
+            if self._pending + n > self.capacity:
+                self.rejected += 1
+                raise Overloaded(f"{self._pending} jobs pending, capacity {self.capacity}")
+            self._pending += n
+
+    def release(self, n: int = 1) -> None:
+        with self._lock:
+            self._pending -= n
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run fn on a worker; the caller must have admitted it first."""
+        fut = self._executor.submit(fn, *args, **kwargs)
+        fut.add_done_callback(lambda _: self.release())
+        return fut
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,176 @@
+# app/batching.py
+"""
+Dynamic micro-batching of query embeddings.
+
+Concurrent `embed_query` callers are queued; a dispatcher thread waits up to
+`window_ms` after the first queued request (or until `max_batch` are queued),
+sends the distinct texts as one `embed_documents` call and hands each caller
+its vector. While `max_inflight` batches are already out, new requests keep
+accumulating, so batches grow with load without a longer window.
+
+Each request keeps its caller's context: a batch only holds requests of one
+`group` (the scheduler's priority class), the most urgent group is sent
+first, and the upstream call runs in the first request's context so the
+scheduler sees the right class. When that call fails with a `rerun_on`
+error (the first caller's deadline ran out), only the first request gets it;
+the rest go back to the front of the queue and are sent under their own.
+
+Enabled for retrieve_chunks with HOMESHIELD_EMBED_BATCH=1; tune with
+HOMESHIELD_EMBED_WINDOW_MS (5), HOMESHIELD_EMBED_MAX_BATCH (16) and
+HOMESHIELD_EMBED_MAX_INFLIGHT (4).
+"""
+from __future__ import annotations
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+Vector = List[float]
+
+
+class _Request(NamedTuple):
+    text: str
+    fut: Future
+    queued_at: float
+    group: Any
+    ctx: contextvars.Context
+
+
+class EmbeddingDispatcher:
+    def __init__(self, embed_documents: Callable[[List[str]], List[Vector]],
+                 max_batch: int = 16, window_ms: float = 5.0, max_inflight: int = 4,
+                 group: Optional[Callable[[], Any]] = None,
+                 rerun_on: Tuple[Type[BaseException], ...] = ()) -> None:
+        self._embed = embed_documents
+        self._group = group or (lambda: 0)  # sortable; lower groups are sent first
+        self._rerun_on = tuple(rerun_on)
+        self.max_batch = max(1, int(max_batch))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self._cond = threading.Condition()
+        self._queue: List[_Request] = []
+        self._slots = threading.BoundedSemaphore(max(1, int(max_inflight)))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_inflight)), thread_name_prefix="hs-embed")
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # stats
+        self.requests = 0
+        self.upstream_calls = 0
+        self.queued_seconds = 0.0
+
+    def embed_query(self, text: str) -> Vector:
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+        req = _Request(text, fut, time.perf_counter(), self._group(), contextvars.copy_context())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EmbeddingDispatcher is closed")
+            self._queue.append(req)
+            self.requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="hs-embed-dispatch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return fut
+
+    def _loop(self) -> None:
+        while True:
+            self._slots.acquire()  # don't collect a batch nobody can send yet
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._queue:
+                    self._slots.release()
+                    return
+                deadline = self._queue[0].queued_at + self.window
+                while len(self._queue) < self.max_batch and not self._closed:
+                    left = deadline - time.perf_counter()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                group = min(r.group for r in self._queue)
+                batch = [r for r in self._queue if r.group == group][:self.max_batch]
+                taken = {id(r) for r in batch}
+                self._queue = [r for r in self._queue if id(r) not in taken]
+                now = time.perf_counter()
+                self.queued_seconds += sum(now - r.queued_at for r in batch)
+                self.upstream_calls += 1
+            self._pool.submit(self._send, batch)
+
+    def _send(self, batch: List[_Request]) -> None:
+        try:
+            # identical texts in one window share a slot in the request
+            unique: Dict[str, int] = {}
+            for r in batch:
+                unique.setdefault(r.text, len(unique))
+            vectors = batch[0].ctx.run(self._embed, list(unique))
+            for r in batch:
+                r.fut.set_result(vectors[unique[r.text]])
+        except BaseException as e:
+            if isinstance(e, self._rerun_on) and len(batch) > 1:
+                batch[0].fut.set_exception(e)
+                self._requeue(batch[1:], e)
+            else:
+                for r in batch:
+                    if not r.fut.done():
+                        r.fut.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _requeue(self, batch: List[_Request], error: BaseException) -> None:
+        with self._cond:
+            if self._closed:
+                for r in batch:
+                    r.fut.set_exception(error)
+                return
+            self._queue[:0] = batch  # queued_at is past the window: they go out next
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            calls = self.upstream_calls
+            return {
+                "requests": self.requests,
+                "upstream_calls": calls,
+                "calls_saved": self.requests - calls,
+                "avg_batch": (self.requests / calls) if calls else 0.0,
+                "avg_queued_ms": (self.queued_seconds / self.requests * 1000.0) if self.requests else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+
+
+_dispatcher: Optional[EmbeddingDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def batching_enabled() -> bool:
+    return os.getenv("HOMESHIELD_EMBED_BATCH", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_dispatcher() -> EmbeddingDispatcher:
+    """Process-wide dispatcher over the Azure embeddings deployment."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                from .scheduler import CALLER_ERRORS, current_rank
+                from .vectorstore import embeddings
+                _dispatcher = EmbeddingDispatcher(
+                    embeddings().embed_documents,
+                    max_batch=int(os.getenv("HOMESHIELD_EMBED_MAX_BATCH", "16")),
+                    window_ms=float(os.getenv("HOMESHIELD_EMBED_WINDOW_MS", "5")),
+                    max_inflight=int(os.getenv("HOMESHIELD_EMBED_MAX_INFLIGHT", "4")),
+                    group=current_rank,
+                    rerun_on=CALLER_ERRORS,
+                )
+    return _dispatcher
@@ -0,0 +1,119 @@
+# app/chunkstore.py
+"""
+Local store for policy chunk text, keyed by chunk_id.
+
+The vector index only carries ids and filter fields; retrieval fetches text
+for the few chunks that survive MMR from here, in one query, through a small
+LRU cache. Backed by SQLite at data/chunks.sqlite3 (HOMESHIELD_CHUNK_STORE
+overrides; HOMESHIELD_CHUNK_CACHE sets the cache size, default 4096).
+
+The store is written by ingestion on the host that ran it. Retrieval on a
+host without it raises MissingChunks rather than answering from nothing.
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    source   TEXT,
+    text     TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_MAX_PARAMS = 900
+
+
+class MissingChunks(RuntimeError):
+    """The index matched chunks whose text isn't in the local store."""
+
+
+def default_store_path() -> Path:
+    return Path(os.getenv("HOMESHIELD_CHUNK_STORE") or ROOT / "data" / "chunks.sqlite3")
+
+
+class ChunkStore:
+    def __init__(self, path: Optional[str | Path] = None, cache_size: Optional[int] = None) -> None:
+        self.path = Path(path or default_store_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = int(cache_size if cache_size is not None
+                              else os.getenv("HOMESHIELD_CHUNK_CACHE", "4096"))
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.absent = 0  # ids asked for that the store doesn't have
+
+    def put_many(self, rows: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Insert or replace (chunk_id, text, source) rows."""
+        rows = [(cid, src, text) for cid, text, src in rows]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, source, text) VALUES (?, ?, ?)", rows
+                )
+            for cid, _, _ in rows:
+                self._cache.pop(cid, None)
+        return len(rows)
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, str]:
+        """Text for every id that exists; unknown ids are left out."""
+        ids = list(dict.fromkeys(chunk_ids))
+        out: Dict[str, str] = {}
+        with self._lock:
+            missing: List[str] = []
+            for cid in ids:
+                text = self._cache.get(cid)
+                if text is None:
+                    missing.append(cid)
+                else:
+                    self._cache.move_to_end(cid)
+                    out[cid] = text
+            self.hits += len(ids) - len(missing)
+            self.misses += len(missing)
+
+            for i in range(0, len(missing), _MAX_PARAMS):
+                part = missing[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(part))
+                for cid, text in self._conn.execute(
+                    f"SELECT chunk_id, text FROM chunks WHERE chunk_id IN ({marks})", part
+                ):
+                    out[cid] = text
+                    self._cache[cid] = text
+            self.absent += len(ids) - len(out)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ChunkStore] = None
+_store_lock = threading.Lock()
+
+
+def chunk_store() -> ChunkStore:
+    """Process-wide store at the default path."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChunkStore()
+    return _store
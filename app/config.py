@@ -9,3 +9,16 @@ def env(name: str) -> str:
     v = os.getenv(name)
     if not v: raise RuntimeError(f"Missing env var: {name}")
     return v
+
+class _Settings:
+    """Settings for the offline jobs, read from the environment on access."""
+
+    @property
+    def PINECONE_NAMESPACE(self) -> str:
+        return os.getenv("PINECONE_NAMESPACE", "policies")
+
+    @property
+    def POLICY_DIR(self) -> str:
+        return os.getenv("POLICY_DIR", str(ROOT / "policies_docs"))
+
+settings = _Settings()
@@ -0,0 +1,367 @@
+# app/scheduler.py
+"""
+Priority scheduling for the shared Azure OpenAI deployments.
+
+Chat and embedding clients from app.vectorstore run every call through a
+Scheduler (one per deployment). Callers tag work with a priority class;
+untagged work is "interactive":
+
+    with scheduler.priority("batch"):
+        ingest_all()
+
+Each class can have a concurrency cap, a tokens-per-minute budget and a
+default deadline; the deployment has its own concurrency and TPM limits.
+When capacity frees up the highest-priority waiter goes first. Lower
+classes leave `reserve` of the deployment's token budget for interactive
+work, and a class with `shed_at` refuses new calls outright (Shed) while
+the budget is below that fraction. A call still queued at its deadline
+raises DeadlineExceeded.
+
+Token budgets are charged an estimate up front (chars / 4, plus
+HOMESHIELD_CHAT_MAX_OUTPUT for chat) and corrected with the usage the
+response reports.
+
+Environment (0 = unlimited):
+  HOMESHIELD_CHAT_TPM, HOMESHIELD_CHAT_CONCURRENCY
+  HOMESHIELD_EMBED_TPM, HOMESHIELD_EMBED_CONCURRENCY
+  HOMESHIELD_SCHED_<CLASS>_CONCURRENCY, _TPM, _DEADLINE_S
+"""
+from __future__ import annotations
+import bisect
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import telemetry
+
+
+class Shed(Exception):
+    """Low-priority work refused because the deployment is near its limits."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call was still waiting for capacity at its deadline."""
+
+
+# failures that belong to one caller's class/deadline rather than to the call;
+# a SingleFlight follower that sees one runs the call itself
+CALLER_ERRORS = (Shed, DeadlineExceeded)
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    name: str
+    rank: int                 # lower goes first
+    concurrency: int = 0      # 0: only the deployment limit applies
+    tpm: int = 0
+    deadline_s: float = 0.0   # 0: wait as long as it takes
+    reserve: float = 0.0      # fraction of the deployment budget left for others
+    shed_at: float = 0.0      # refuse new calls while the budget is below this
+
+
+DEFAULT_CLASSES: Tuple[PriorityClass, ...] = (
+    PriorityClass("interactive", 0, deadline_s=30.0),
+    PriorityClass("background", 1, concurrency=4, deadline_s=60.0, reserve=0.2, shed_at=0.1),
+    PriorityClass("batch", 2, concurrency=2, reserve=0.4),
+)
+
+_ctx: ContextVar[Tuple[str, Optional[float]]] = ContextVar("homeshield_priority", default=("interactive", None))
+
+
+@contextmanager
+def priority(name: str, timeout_s: Optional[float] = None) -> Iterator[None]:
+    """Run the enclosed calls in class `name`; timeout_s sets one deadline
+    for all of them (otherwise each call gets the class default)."""
+    deadline = time.monotonic() + timeout_s if timeout_s is not None else None
+    token = _ctx.set((name, deadline))
+    try:
+        yield
+    finally:
+        _ctx.reset(token)
+
+
+def current_priority() -> str:
+    return _ctx.get()[0]
+
+
+_RANKS = {c.name: c.rank for c in DEFAULT_CLASSES}
+
+
+def current_rank() -> Tuple[int, str]:
+    """Sort key of the current class, most urgent first."""
+    name = _ctx.get()[0]
+    return _RANKS.get(name, len(_RANKS)), name
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """Refills at tpm/60 per second up to `burst_s` seconds' worth."""
+
+    def __init__(self, tpm: float, burst_s: float = 10.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = float(tpm) / 60.0
+        self.capacity = max(1.0, self.rate * burst_s)
+        self.level = self.capacity
+        self._clock = clock
+        self._t = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._t) * self.rate)
+        self._t = now
+
+    def fraction(self) -> float:
+        self._refill()
+        return self.level / self.capacity
+
+    def wait_for(self, n: float, floor: float = 0.0) -> float:
+        """Seconds until `n` tokens can be taken without dropping below
+        `floor`; requests bigger than the bucket only need a full one."""
+        self._refill()
+        need = min(n, self.capacity * (1.0 - floor)) + floor * self.capacity - self.level
+        return max(0.0, need / self.rate) if self.rate else float("inf")
+
+    def take(self, n: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level - n)  # may go into debt
+
+
+@dataclass
+class _Ticket:
+    cls: PriorityClass
+    seq: int
+    tokens: float
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.cls.rank, self.seq) < (other.cls.rank, other.seq)
+
+
+class Scheduler:
+    def __init__(self, name: str, tpm: float = 0, concurrency: int = 0,
+                 classes: Sequence[PriorityClass] = DEFAULT_CLASSES, burst_s: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.concurrency = max(0, int(concurrency))
+        self.classes: Dict[str, PriorityClass] = {c.name: c for c in classes}
+        self._clock = clock
+        self._bucket = TokenBucket(tpm, burst_s, clock) if tpm else None
+        self._class_buckets = {c.name: TokenBucket(c.tpm, burst_s, clock) for c in classes if c.tpm}
+        self._cond = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._running: Dict[str, int] = {c.name: 0 for c in classes}
+        self._total = 0
+        self._seq = itertools.count()
+        self._stats: Dict[str, Dict[str, float]] = {
+            c.name: {"admitted": 0, "shed": 0, "expired": 0, "wait_s": 0.0, "tokens": 0.0} for c in classes
+        }
+
+    # ----------------------------------------------------------- admission --
+
+    def _blocked(self, t: _Ticket) -> Tuple[Optional[str], float]:
+        """(None, 0) if t could start now, else what blocks it ("class" or
+        "deployment") and how long a token refill would take."""
+        c = t.cls
+        if c.concurrency and self._running[c.name] >= c.concurrency:
+            return "class", float("inf")
+        cb = self._class_buckets.get(c.name)
+        if cb is not None:
+            w = cb.wait_for(t.tokens)
+            if w > 0:
+                return "class", w
+        if self.concurrency and self._total >= self.concurrency:
+            return "deployment", float("inf")
+        if self._bucket is not None:
+            w = self._bucket.wait_for(t.tokens, floor=c.reserve)
+            if w > 0:
+                return "deployment", w
+        return None, 0.0
+
+    def _may_start(self, t: _Ticket) -> Tuple[bool, float]:
+        # strict priority over the deployment: t waits while anyone ahead of
+        # it could start or is waiting on the shared limits; only waiters
+        # stuck on their own class limits are passed
+        for u in self._waiting:
+            if u is t:
+                break
+            if self._blocked(u)[0] != "class":
+                return False, float("inf")
+        why, wait = self._blocked(t)
+        return why is None, wait
+
+    def acquire(self, tokens: float, cls: Optional[str] = None, deadline: Optional[float] = None) -> _Ticket:
+        name, ctx_deadline = _ctx.get()
+        c = self.classes.get(cls or name)
+        if c is None:
+            raise ValueError(f"Unknown priority class {cls or name!r}")
+        if deadline is None:
+            deadline = ctx_deadline
+        if deadline is None and c.deadline_s:
+            deadline = self._clock() + c.deadline_s
+        t = _Ticket(c, next(self._seq), float(tokens))
+        start = self._clock()
+        with self._cond:
+            st = self._stats[c.name]
+            if c.shed_at and self._bucket is not None and self._bucket.fraction() < c.shed_at:
+                st["shed"] += 1
+                raise Shed(f"{self.name}: {c.name} work shed, token budget nearly spent")
+            bisect.insort(self._waiting, t)
+            try:
+                while True:
+                    ok, wait = self._may_start(t)
+                    if ok:
+                        break
+                    now = self._clock()
+                    if deadline is not None:
+                        if now >= deadline:
+                            st["expired"] += 1
+                            raise DeadlineExceeded(f"{self.name}: {c.name} call waited past its deadline")
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(min(wait, 0.25))
+            finally:
+                self._waiting.remove(t)
+                self._cond.notify_all()
+            self._running[c.name] += 1
+            self._total += 1
+            if self._bucket is not None:
+                self._bucket.take(t.tokens)
+            if c.name in self._class_buckets:
+                self._class_buckets[c.name].take(t.tokens)
+            st["admitted"] += 1
+            st["wait_s"] += self._clock() - start
+            st["tokens"] += t.tokens
+        return t
+
+    def release(self, t: _Ticket, used: Optional[float] = None) -> None:
+        """Give back t's slot; `used` corrects the token estimate."""
+        with self._cond:
+            self._running[t.cls.name] -= 1
+            self._total -= 1
+            if used is not None:
+                extra = used - t.tokens
+                for b in (self._bucket, self._class_buckets.get(t.cls.name)):
+                    if b is not None:
+                        b.take(extra)
+                self._stats[t.cls.name]["tokens"] += extra
+            self._cond.notify_all()
+
+    def run(self, fn: Callable[..., Any], *args, tokens: float = 0,
+            usage: Optional[Callable[[Any], Optional[float]]] = None, **kwargs) -> Any:
+        with telemetry.span("sched.wait", deployment=self.name, cls=current_priority()):
+            t = self.acquire(tokens)
+        used = None
+        try:
+            result = fn(*args, **kwargs)
+            used = usage(result) if usage is not None else None
+            return result
+        finally:
+            self.release(t, used)
+
+    # --------------------------------------------------------------- stats --
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out: Dict[str, Any] = {
+                "running": self._total,
+                "waiting": len(self._waiting),
+                "budget": round(self._bucket.fraction(), 3) if self._bucket is not None else None,
+            }
+            for name, st in self._stats.items():
+                n = st["admitted"]
+                out[name] = {**st, "avg_wait_ms": (st["wait_s"] / n * 1000.0) if n else 0.0}
+            return out
+
+
+# ------------------------------------------------------------------ clients --
+
+def _estimate_tokens(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value) // 4 + 1
+    if isinstance(value, dict):
+        return _estimate_tokens(value.get("content", ""))
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_tokens(v) for v in value)
+    return _estimate_tokens(getattr(value, "content", "") or "")
+
+
+def _chat_usage(resp: Any) -> Optional[float]:
+    usage = telemetry.token_usage(resp)
+    return float(sum(usage)) if usage else None
+
+
+class ScheduledChat:
+    """Chat model wrapper whose invoke() waits its turn on the scheduler."""
+
+    def __init__(self, llm: Any, scheduler: "Scheduler", max_output: int = 512) -> None:
+        self._llm = llm
+        self._scheduler = scheduler
+        self._max_output = max_output
+
+    def invoke(self, messages: Any, *args, **kwargs) -> Any:
+        return self._scheduler.run(self._llm.invoke, messages, *args,
+                                   tokens=_estimate_tokens(messages) + self._max_output,
+                                   usage=_chat_usage, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
+
+
+class ScheduledEmbeddings:
+    """Embeddings wrapper; every request waits its turn on the scheduler."""
+
+    def __init__(self, emb: Any, scheduler: "Scheduler") -> None:
+        self._emb = emb
+        self._scheduler = scheduler
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._scheduler.run(self._emb.embed_query, text, tokens=_estimate_tokens(text))
+
+    def embed_documents(self, texts: List[str], *args, **kwargs) -> List[List[float]]:
+        return self._scheduler.run(self._emb.embed_documents, texts, *args,
+                                   tokens=_estimate_tokens(list(texts)), **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._emb, name)
+
+
+def classes_from_env(classes: Sequence[PriorityClass] = DEFAULT_CLASSES) -> Tuple[PriorityClass, ...]:
+    out = []
+    for c in classes:
+        p = f"HOMESHIELD_SCHED_{c.name.upper()}_"
+        out.append(replace(
+            c,
+            concurrency=int(_env_num(p + "CONCURRENCY", c.concurrency)),
+            tpm=int(_env_num(p + "TPM", c.tpm)),
+            deadline_s=_env_num(p + "DEADLINE_S", c.deadline_s),
+        ))
+    return tuple(out)
+
+
+_schedulers: Dict[str, Scheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(deployment: str) -> Scheduler:
+    """Process-wide scheduler for "chat" or "embed"."""
+    s = _schedulers.get(deployment)
+    if s is None:
+        with _schedulers_lock:
+            s = _schedulers.get(deployment)
+            if s is None:
+                key = f"HOMESHIELD_{deployment.upper()}_"
+                s = _schedulers[deployment] = Scheduler(
+                    deployment,
+                    tpm=_env_num(key + "TPM", 0),
+                    concurrency=int(_env_num(key + "CONCURRENCY", 0)),
+                    classes=classes_from_env(),
+                )
+    return s
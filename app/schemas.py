@@ -1,5 +1,6 @@
 # app/schemas.py
-from pydantic import BaseModel, field_validator
+from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 class Customer(BaseModel):
     customer_id: str
@@ -19,3 +20,39 @@ class CoverageQuestion(BaseModel):
 class ClaimRequest(BaseModel):
     customer_id: str
     issue_description: str
+
+# ---- HTTP API payloads ----
+# Either customer_id or plan/state/effective_year picks the policy.
+
+class PolicyScope(BaseModel):
+    customer_id: Optional[str] = None
+    plan: Optional[str] = None
+    state: Optional[str] = None
+    effective_year: Optional[int] = None
+
+    @field_validator("state")
+    @classmethod
+    def state_upper(cls, v: Optional[str]) -> Optional[str]:
+        return v.upper() if v else v
+
+    @model_validator(mode="after")
+    def policy_given(self) -> "PolicyScope":
+        if not self.customer_id and not (self.plan and self.state and self.effective_year):
+            raise ValueError("Provide customer_id, or plan, state and effective_year.")
+        return self
+
+class CoverageQuery(PolicyScope):
+    question: str
+    k: int = Field(8, ge=1, le=24)  # retrieval fetches 24 candidates for MMR (rag.FETCH_K)
+
+class ClaimQuery(PolicyScope):
+    issue_description: str
+
+class RetrieveQuery(PolicyScope):
+    query: str
+    k: int = Field(8, ge=1, le=24)
+    policy_source: Optional[str] = None
+
+class UpgradeQuery(PolicyScope):
+    issue: str
+    limit: int = Field(3, ge=1, le=10)
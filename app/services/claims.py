@@ -4,6 +4,8 @@ import json
 from typing import Dict, Any, List, Optional
 
 from .rag import retrieve_chunks, format_citations
+from .. import scheduler, telemetry
+from ..singleflight import SingleFlight
 from ..vectorstore import chat_client
 
 SYSTEM_ADJUDICATE = (
@@ -18,17 +20,27 @@ SYSTEM_ADJUDICATE = (
     "{\"covered\":\"yes|no|uncertain\",\"reason\":\"...\",\"resolved_question\":\"...\"}"
 )
 
+# evaluate_claim and upgrades.py can ask for the same verdict concurrently
+verdict_flight = SingleFlight("verdict", scope=scheduler.current_priority, rerun_on=scheduler.CALLER_ERRORS)
+
 def _structured_llm_verdict(issue: str, docs) -> Dict[str, Any]:
+    key = (issue, tuple(d.page_content for d in (docs or [])))
+    return dict(verdict_flight.do(key, _llm_verdict, issue, docs))
+
+def _llm_verdict(issue: str, docs) -> Dict[str, Any]:
     llm = chat_client(temperature=0)
     context = "\n\n---\n\n".join(
         f"{d.metadata.get('source','')}, p.{int(d.metadata.get('page',0))}\n{d.page_content}"
         for d in (docs or [])
     )
     user = f"Issue:\n{issue}\n\nPolicy context:\n{context}"
-    raw = llm.invoke([
-        {"role": "system", "content": SYSTEM_ADJUDICATE},
-        {"role": "user", "content": user}
-    ]).content.strip()
+    with telemetry.span("llm.adjudicate", chunks=len(docs or [])) as sp:
+        resp = llm.invoke([
+            {"role": "system", "content": SYSTEM_ADJUDICATE},
+            {"role": "user", "content": user}
+        ])
+        sp.record_usage(resp)
+    raw = resp.content.strip()
 
     raw = raw.strip().replace("```json", "").replace("```", "").strip()
     try:
@@ -59,6 +71,10 @@ def evaluate_claim(issue: str, plan: str, state: str, year: int,
     - Ask LLM for a JSON verdict (yes/no/uncertain)
     - Return boolean + reason + citations
     """
+    with telemetry.request("evaluate_claim", plan=plan, state=state, year=year):
+        return _evaluate_claim(issue, plan, state, year)
+
+def _evaluate_claim(issue: str, plan: str, state: str, year: int) -> Dict[str, Any]:
     docs = retrieve_chunks(issue, plan, state, int(year), k=8)
     if not docs:
         return {
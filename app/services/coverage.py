@@ -2,6 +2,7 @@
 import json
 from typing import Dict, Any, List
 from .rag import retrieve_chunks, format_citations
+from .. import telemetry
 from ..vectorstore import chat_client
 
 def _coerce_list(x: Any) -> List[str]:
@@ -70,7 +71,10 @@ def _structured_summary(issue: str, docs) -> Dict[str, Any]:
         "{\"Per-Claim Limit\":\"$5000\",\"Service Fee\":\"$60 per service request\",\"Combined Annual Limit\":\"$30000\"}."
     )
     user = f"Item/topic: {issue}\n\nPolicy context:\n{ctx}"
-    raw = llm.invoke([{"role":"system","content":sys},{"role":"user","content":user}]).content.strip()
+    with telemetry.span("llm.coverage_summary", chunks=len(docs)) as sp:
+        resp = llm.invoke([{"role":"system","content":sys},{"role":"user","content":user}])
+        sp.record_usage(resp)
+    raw = resp.content.strip()
     raw = raw.strip().removeprefix("```json").removesuffix("```").strip()
 
     data: Dict[str, Any]
@@ -109,6 +113,10 @@ def check_coverage(issue: str, plan: str, state: str, year: int, k: int = 8) ->
     """
     Neutral coverage overview. Not a yes/no claim verdict.
     """
+    with telemetry.request("check_coverage", plan=plan, state=state, year=year):
+        return _check_coverage(issue, plan, state, year, k)
+
+def _check_coverage(issue: str, plan: str, state: str, year: int, k: int) -> Dict[str, Any]:
     docs = retrieve_chunks(issue, plan, state, year, k=k)
     if not docs:
         return {
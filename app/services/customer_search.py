@@ -0,0 +1,315 @@
+# app/services/customer_search.py
+"""
+Type-ahead customer search by ID prefix, email prefix or (fuzzy) name.
+
+The index is built once from the customers CSV:
+  - IDs and emails are packed into one bytes blob per column with a sorted
+    permutation, so a prefix is one bisect plus a short scan.
+  - First and last names are interned into a vocabulary of distinct names.
+    Query words match names by prefix (sorted vocabulary) or by trigram
+    overlap (trigram -> names), and names map to rows through CSR posting
+    arrays, so a common surname costs one numpy slice, not a Python loop.
+
+    from app.services.customer_search import search_customers
+    search_customers("garc", k=5)   # [{"id", "name", "email", "score", "match"}, ...]
+
+`customer_index()` rebuilds when CUSTOMERS_CSV changes on disk.
+"""
+from __future__ import annotations
+import csv
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+_ID_LIKE = re.compile(r"^[A-Za-z]{0,3}\d+$|^[A-Za-z]$")
+_NOT_A_NAME = re.compile(r"[@\d.]")  # emails and IDs
+
+# per-word candidates considered before rows are touched
+MAX_PREFIX_NAMES = 50
+MAX_FUZZY_NAMES = 20
+MIN_TRIGRAM_SCORE = 0.5
+
+
+class _Strings:
+    """Strings packed into one utf-8 blob; s[i] decodes the i-th."""
+
+    def __init__(self, values: Iterable[str]) -> None:
+        enc = [v.encode("utf-8") for v in values]
+        self._blob = b"".join(enc)
+        self._off = array("Q", accumulate(map(len, enc), initial=0))
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[self._off[i]:self._off[i + 1]].decode("utf-8")
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._blob) + self._off.itemsize * len(self._off)
+
+
+class _Sorted:
+    """A column viewed in sorted order, for bisect."""
+
+    def __init__(self, col: _Strings, order: "np.ndarray") -> None:
+        self.col = col
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, pos: int) -> str:
+        return self.col[int(self.order[pos])]
+
+    def prefix(self, p: str, limit: int) -> List[Tuple[int, str]]:
+        """(row, value) for up to `limit` values starting with p, in order."""
+        out = []
+        i = bisect_left(self, p)
+        while i < len(self.order) and len(out) < limit:
+            row = int(self.order[i])
+            v = self.col[row]
+            if not v.startswith(p):
+                break
+            out.append((row, v))
+            i += 1
+        return out
+
+    def nbytes(self) -> int:
+        return self.order.nbytes
+
+
+def _trigrams(word: str) -> set:
+    w = f"  {word} "
+    return {w[i:i + 3] for i in range(len(w) - 2)}
+
+
+class CustomerIndex:
+    def __init__(self, rows: Iterable[Dict[str, Any]]) -> None:
+        import numpy as np
+
+        ids: List[str] = []
+        emails: List[str] = []
+        first: List[int] = []
+        last: List[int] = []
+        vocab: Dict[str, int] = {}
+        for r in rows:
+            ids.append(str(r.get("customer_id", "")).strip().upper())
+            emails.append(str(r.get("email", "")).strip().lower())
+            first.append(vocab.setdefault(str(r.get("first_name", "")).strip(), len(vocab)))
+            last.append(vocab.setdefault(str(r.get("last_name", "")).strip(), len(vocab)))
+
+        self.ids = _Strings(ids)
+        self.emails = _Strings(emails)
+        self._by_id = _Sorted(self.ids, np.array(sorted(range(len(ids)), key=ids.__getitem__), dtype=np.int32))
+        self._by_email = _Sorted(self.emails, np.array(sorted(range(len(emails)), key=emails.__getitem__),
+                                                       dtype=np.int32))
+        del ids, emails
+
+        self.names = list(vocab)  # display form, by name id
+        lower = [n.lower() for n in self.names]
+        self._names_sorted = _Sorted(_Strings(lower), np.array(sorted(range(len(lower)), key=lower.__getitem__),
+                                                               dtype=np.int32))
+        grams: Dict[str, List[int]] = {}
+        ngrams = []
+        for nid, n in enumerate(lower):
+            mine = set().union(*(_trigrams(w) for w in _WORD.findall(n)))
+            for g in mine:
+                grams.setdefault(g, []).append(nid)
+            ngrams.append(len(mine))
+        self._trigram_names = {g: np.asarray(ids, dtype=np.int32) for g, ids in grams.items()}
+        self._name_ngrams = np.asarray(ngrams, dtype=np.float32)
+        del grams, ngrams
+
+        self.first = np.asarray(first, dtype=np.int32)
+        self.last = np.asarray(last, dtype=np.int32)
+        del first, last
+        # CSR postings: rows holding name id n are _post_rows[_post_start[n]:_post_start[n + 1]],
+        # ordered by the row's other name (_post_co) so a first+last pair is a searchsorted range
+        both = np.concatenate([self.first, self.last])
+        co = np.concatenate([self.last, self.first])
+        order = np.lexsort((co, both))
+        self._post_rows = (order % len(self.first)).astype(np.int32)
+        self._post_co = co[order]
+        self._post_start = np.searchsorted(both[order], np.arange(len(self.names) + 1)).astype(np.int64)
+        del both, co, order
+
+    @classmethod
+    def from_csv(cls, path: str) -> "CustomerIndex":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return cls(csv.DictReader(f))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the index."""
+        grams = sys.getsizeof(self._trigram_names) + self._name_ngrams.nbytes
+        grams += sum(sys.getsizeof(g) + a.nbytes for g, a in self._trigram_names.items())
+        return (self.ids.nbytes() + self.emails.nbytes() + self._by_id.nbytes() + self._by_email.nbytes()
+                + self._names_sorted.col.nbytes() + self._names_sorted.nbytes()
+                + sum(sys.getsizeof(n) for n in self.names) + grams
+                + self.first.nbytes + self.last.nbytes + self._post_rows.nbytes + self._post_co.nbytes
+                + self._post_start.nbytes)
+
+    # -------------------------------------------------------------- search --
+
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """Best k customers for a partial ID, email or name, best first."""
+        q = query.strip()
+        if not q or k <= 0:
+            return []
+        scores: Dict[int, Tuple[float, str]] = {}
+
+        def offer(row: int, score: float, how: str) -> None:
+            if score > scores.get(row, (0.0, ""))[0]:
+                scores[row] = (score, how)
+
+        if _ID_LIKE.match(q):
+            p = q.upper()
+            for row, v in self._by_id.prefix(p, k):
+                offer(row, 1.0 if v == p else 0.9, "id")
+        if " " not in q:
+            p = q.lower()
+            for row, v in self._by_email.prefix(p, k):
+                offer(row, 0.95 if v == p else 0.8, "email")
+        if not _NOT_A_NAME.search(q):
+            for row, score in self._name_rows(q.lower(), k):
+                offer(row, 0.85 * score, "name")
+
+        best = sorted(scores.items(), key=lambda kv: (-kv[1][0], kv[0]))[:k]
+        return [self._result(row, score, how) for row, (score, how) in best]
+
+    def _result(self, row: int, score: float, how: str) -> Dict[str, Any]:
+        return {
+            "id": self.ids[row],
+            "name": f"{self.names[self.first[row]]} {self.names[self.last[row]]}".strip(),
+            "email": self.emails[row],
+            "score": round(score, 3),
+            "match": how,
+        }
+
+    def _name_matches(self, word: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(name ids, similarity) for one query word: prefix of the name,
+        plus trigram overlap (typos) unless the word is itself a name."""
+        import numpy as np
+
+        found: Dict[int, float] = {}
+        exact = False
+        for nid, name in self._names_sorted.prefix(word, MAX_PREFIX_NAMES):
+            found[nid] = 0.6 + 0.4 * len(word) / max(len(name), 1)
+            exact = exact or len(name) == len(word)
+        if len(word) >= 3 and not exact:  # an exact name outranks any typo of it
+            grams = _trigrams(word)
+            lists = [self._trigram_names[g] for g in grams if g in self._trigram_names]
+            if lists:
+                nids, shared = np.unique(np.concatenate(lists), return_counts=True)
+                dice = 2.0 * shared / (len(grams) + self._name_ngrams[nids])
+                keep = np.flatnonzero(dice >= MIN_TRIGRAM_SCORE)
+                if len(keep) > MAX_FUZZY_NAMES:
+                    keep = keep[np.argpartition(-dice[keep], MAX_FUZZY_NAMES - 1)[:MAX_FUZZY_NAMES]]
+                for nid, d in zip(nids[keep].tolist(), dice[keep].tolist()):
+                    found[nid] = max(found.get(nid, 0.0), 0.9 * d)
+        return (np.fromiter(found, dtype=np.int64, count=len(found)),
+                np.fromiter(found.values(), dtype=np.float32, count=len(found)))
+
+    def _name_rows(self, q: str, k: int) -> List[Tuple[int, float]]:
+        import numpy as np
+
+        words = _WORD.findall(q)
+        matches = [self._name_matches(w) for w in words]
+        if not matches or not all(len(nids) for nids, _ in matches):
+            return []  # every word has to match some name
+
+        out: Dict[int, float] = {}
+        if len(matches) == 1:
+            # best names first; rows under a name all score the same, so
+            # stop as soon as k rows are in hand
+            nids, sims = matches[0]
+            for i in np.argsort(-sims, kind="stable"):
+                nid = nids[i]
+                for row in self._post_rows[self._post_start[nid]:self._post_start[nid + 1]][:k]:
+                    out.setdefault(int(row), float(sims[i]))
+                if len(out) >= k:
+                    break
+            return list(out.items())[:k]
+
+        # candidates: rows whose two names match the two words with the
+        # fewest matched names (one co-name range lookup per pivot name);
+        # any further words are then checked through the rows' name ids
+        matches.sort(key=lambda m: len(m[0]))
+        (a_nids, a_sims), (b_nids, b_sims) = matches[0], matches[1]
+        b_order = np.argsort(b_nids)
+        b_nids, b_sims = b_nids[b_order], b_sims[b_order]
+        bounds = np.concatenate([b_nids, b_nids + 1])
+        parts, part_sims = [], []
+        for nid, sim in zip(a_nids.tolist(), a_sims.tolist()):
+            lo, hi = self._post_start[nid], self._post_start[nid + 1]
+            co = self._post_co[lo:hi]
+            starts, ends = np.searchsorted(co, bounds).reshape(2, -1)
+            for j in np.flatnonzero(ends > starts):
+                parts.append(self._post_rows[lo + starts[j]:lo + ends[j]])
+                part_sims.append(np.full(ends[j] - starts[j], sim + b_sims[j], dtype=np.float32))
+        if not parts:
+            return []
+        rows, total = np.concatenate(parts), np.concatenate(part_sims)
+        if len(matches) > 2:
+            dense = np.zeros(len(self.names), dtype=np.float32)
+            fi, la = self.first[rows], self.last[rows]
+            ok = np.ones(len(rows), dtype=bool)
+            for m_nids, m_sims in matches[2:]:
+                dense[m_nids] = m_sims
+                ws = np.maximum(dense[fi], dense[la])
+                dense[m_nids] = 0.0
+                total += ws
+                ok &= ws > 0
+            rows, total = rows[ok], total[ok]
+        total /= len(words)
+        if len(rows) > 2 * k:  # a row can turn up twice (names matched either way round)
+            top = np.argpartition(-total, 2 * k - 1)[:2 * k]
+            rows, total = rows[top], total[top]
+        for i in np.argsort(-total, kind="stable"):
+            out.setdefault(int(rows[i]), float(total[i]))
+        return list(out.items())[:k]
+
+
+_index: Optional[CustomerIndex] = None
+_index_key: Optional[Tuple[str, int]] = None
+_index_lock = threading.Lock()
+
+
+def customer_index() -> CustomerIndex:
+    """Process-wide index over CUSTOMERS_CSV, rebuilt if the file changes."""
+    global _index, _index_key
+    path = os.environ["CUSTOMERS_CSV"]
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if _index is None or _index_key != key:
+        with _index_lock:
+            if _index is None or _index_key != key:
+                _index = CustomerIndex.from_csv(path)
+                _index_key = key
+    return _index
+
+
+def search_customers(query: str, k: int = 10) -> List[Dict[str, Any]]:
+    return customer_index().search(query, k)
+
+
+def resolve_customer_id(query: str, hits: List[Dict[str, Any]],
+                        choose: Callable[[List[Dict[str, Any]]], Optional[int]]) -> str:
+    """ID to load for what was typed in the customer box. An exact ID, or
+    text nothing matches, is used as typed; otherwise nothing loads until
+    `choose(hits)` returns the index of the customer the agent picked."""
+    q = query.strip()
+    if not q or not hits or any(h["id"] == q.upper() for h in hits):
+        return q
+    i = choose(hits)
+    return hits[i]["id"] if i is not None else ""
@@ -1,14 +1,23 @@
+from __future__ import annotations
 import os, re
-import pandas as pd
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pandas is imported on first lookup, not at module load
+    import pandas as pd
 
 YEAR_RE = re.compile(r"(19|20)\d{2}")
 
+class CustomerNotFound(KeyError):
+    """No customer has the requested ID."""
+
 def _df() -> pd.DataFrame:
+    import pandas as pd
     csv = os.environ["CUSTOMERS_CSV"]
     # small robustness: keep strings, handle BOM, don't turn blanks into NaN
     return pd.read_csv(csv, dtype=str, keep_default_na=False, encoding="utf-8-sig")
 
 def get_customer(customer_id: str) -> dict:
+    import pandas as pd
     df = _df()
 
     # derive effective_year if missing, but don't crash on mixed date formats
@@ -20,7 +29,7 @@ def get_customer(customer_id: str) -> dict:
     # match case-insensitively
     row = df[df["customer_id"].astype(str).str.upper() == str(customer_id).upper()]
     if row.empty:
-        raise KeyError("Customer not found")
+        raise CustomerNotFound("Customer not found")
     r = row.iloc[0].to_dict()
 
     # fallback: try to infer year from policy_doc like LHG_Silver_TX_2025.txt
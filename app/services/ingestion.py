@@ -1,13 +1,12 @@
 import os, time
 from pathlib import Path
 from typing import List
-from tqdm import tqdm
-
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 
+from .. import scheduler
+from ..chunkstore import chunk_store
 from ..config import settings
 from ..vectorstore import embeddings_client, pinecone_index
+from .plan_diffs import write_plan_table
 
 
 def _parse_meta_from_filename(path: str):
@@ -32,17 +31,30 @@ def _parse_meta_from_filename(path: str):
     return meta
 
 
+CHUNK_SIZE = 900
+CHUNK_OVERLAP = 120
+
+
+def text_splitter():
+    """The splitter ingestion chunks with; the per-customer policy cache
+    must chunk the same way to match what was indexed."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True
+    )
+
+
 def load_and_chunk(policy_dir: str):
+    from langchain_community.document_loaders import TextLoader
+
     raw = []
     for p in Path(policy_dir).glob("*.txt"):
         raw.extend(TextLoader(str(p), encoding="utf-8").load())
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=900,
-        chunk_overlap=120,
-        add_start_index=True
-    )
-    docs = splitter.split_documents(raw)
+    docs = text_splitter().split_documents(raw)
 
     for i, d in enumerate(docs):
         src = d.metadata.get("source", "")
@@ -61,25 +73,32 @@ def load_and_chunk(policy_dir: str):
     return docs
 
 
+# Only what retrieval filters on or cites; the chunk text goes to the local
+# chunk store instead of riding along with every query result.
+INDEX_METADATA = ("chunk_id", "source", "policy_file", "plan", "state", "effective_year", "page")
+
+
 def upsert_documents(docs):
+    from tqdm import tqdm
+
     emb = embeddings_client()
     index = pinecone_index()
+    store = chunk_store()
     ns = settings.PINECONE_NAMESPACE
 
     BATCH = 64
     for i in tqdm(range(0, len(docs), BATCH), desc="Upserting"):
         batch = docs[i:i + BATCH]
         vecs = emb.embed_documents([d.page_content for d in batch])
+        # text must be in the store before its vector becomes searchable
+        store.put_many((d.metadata["chunk_id"], d.page_content, d.metadata.get("source")) for d in batch)
 
         vectors = []
         for j, d in enumerate(batch):
             vectors.append({
                 "id": f"hs-{i + j:08d}",
                 "values": vecs[j],
-                "metadata": {
-                    **d.metadata,
-                    "text": d.page_content,   # keep raw text in metadata
-                },
+                "metadata": {k: d.metadata[k] for k in INDEX_METADATA if k in d.metadata},
             })
 
         index.upsert(vectors=vectors, namespace=ns)
@@ -88,4 +107,8 @@ def upsert_documents(docs):
 
 def ingest_all():
     docs = load_and_chunk(settings.POLICY_DIR)
-    upsert_documents(docs)
+    # embedding calls queue behind interactive traffic on the shared deployment
+    with scheduler.priority("batch"):
+        upsert_documents(docs)
+    # plan-difference lookup table for upgrade suggestions
+    write_plan_table(settings.POLICY_DIR)
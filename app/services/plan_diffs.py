@@ -0,0 +1,509 @@
+# app/services/plan_diffs.py
+"""
+Precomputed plan-difference tables.
+
+Policy documents are generated from one template per (plan, state, year), so
+the facts an upgrade suggestion needs (which components are covered, the
+exclusions, labor/parts, per-claim limit, service fee ...) can be parsed once
+at ingestion time instead of being rediscovered through retrieval + LLM on
+every request.
+
+    python -m app.services.plan_diffs [policy_dir] [out.json]
+
+builds the table; `evaluate_from_table` answers an upgrade question from it,
+or returns None when the issue doesn't map onto anything in the table,
+names a cause the table can't classify or an appliance it doesn't list.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from itertools import permutations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+TABLE_VERSION = 2
+
+SECTION_RE = re.compile(r"^SECTION(?:\s+\d+)?\s+[–-]\s+(.+)$")
+COMPONENT_RE = re.compile(r"^-\s+(.+?)\s+is\s+(not\s+covered|excluded|covered)\b", re.IGNORECASE)
+TERM_RE = re.compile(r"^-\s+([^:]+):\s*(.+)$")
+ANNUAL_RE = re.compile(r"combined annual limit is \$?([\d,]+)", re.IGNORECASE)
+# "Pre-existing conditions and improper installation are excluded." inside a component clause
+CLAUSE_EXCLUSION_RE = re.compile(r"([^.]*?)\s+(?:is|are)\s+excluded\b", re.IGNORECASE)
+EXAMPLES_RE = re.compile(r"\(eg,?\s*([^)]*)\)", re.IGNORECASE)
+# "failed due to improper installation" -> the cause the issue gives
+CAUSE_RE = re.compile(r"\b(?:due to|caused by|because(?: of)?|as a result of|result(?:ed|ing)? from)\s+([^,.;]+)")
+
+# coverage-summary label -> table key
+TERM_KEYS = {
+    "parts covered": "parts_covered",
+    "labor covered": "labor_covered",
+    "per-claim limit": "per_claim_limit",
+    "service fee (deductible)": "service_fee",
+    "waiting period": "waiting_period",
+}
+TERM_LABELS = {
+    "parts_covered": "Parts Covered",
+    "labor_covered": "Labor Covered",
+    "per_claim_limit": "Per-Claim Limit",
+    "service_fee": "Service Fee",
+    "annual_limit": "Combined Annual Limit",
+    "waiting_period": "Waiting Period",
+}
+BOOL_TERMS = ("parts_covered", "labor_covered")
+
+# how customers phrase a term
+TERM_PHRASES = {
+    "labor_covered": ("labor", "labour"),
+    "parts_covered": ("parts",),
+    "per_claim_limit": ("per-claim limit", "per claim limit", "claim limit"),
+    "service_fee": ("service fee", "deductible", "dispatch fee"),
+    "annual_limit": ("annual limit", "yearly limit"),
+    "waiting_period": ("waiting period",),
+}
+
+# extra phrasings for components; "Leaks" sits under ROOF and must not
+# swallow "dishwasher leaks"
+COMPONENT_PHRASES = {
+    "leaks": ("roof leak", "roof leaks", "leaking roof"),
+    "refrigerator": ("refrigerator", "fridge", "ice maker"),
+    "range/oven": ("range", "oven", "stove"),
+    "garbage disposal": ("garbage disposal", "disposal"),
+    "breaker panel": ("breaker panel", "electrical panel", "breaker"),
+    "gfci protection": ("gfci",),
+    "washer": ("washer", "washing machine"),
+    "drive belt": ("drive belt", "belt"),
+    "refrigerant lines": ("refrigerant",),
+}
+# phrases that contain a component word but aren't that component
+NOT_COMPONENT = {
+    "range/oven": ("range hood", "range of", "price range"),
+}
+# parts that only count when their section or one of its appliances is named:
+# 'ceiling fan motor' is not the Laundry motor
+GENERIC_COMPONENTS = {"motor", "drive belt", "control board", "wiring", "leaks", "drainage", "flashing"}
+# words that name a section besides its title and its own components
+SECTION_PHRASES = {
+    "HVAC": ("air conditioner", "ac unit", "a/c", "heat pump"),
+    "PLUMBING": ("pipe", "sink", "toilet", "faucet"),
+    "ELECTRICAL": ("electric",),
+}
+# appliances and systems no plan lists; an issue naming one goes to retrieval + LLM
+UNLISTED_APPLIANCES = (
+    "ceiling fan", "exhaust fan", "range hood", "garage door", "pool", "spa", "hot tub", "well pump",
+    "septic", "sprinkler", "irrigation", "solar", "generator", "water softener", "freezer",
+    "wine cooler", "trash compactor", "furnace", "boiler", "humidifier", "dehumidifier", "doorbell",
+    "central vacuum",
+)
+# other wordings of exclusion keywords; keywords also match by stem ('rust' -> 'rusted')
+EXCLUSION_PHRASES = {
+    "cosmetic damage": ("cosmetic", "scratch"),
+    "acts of god": ("act of god",),
+    "corrosion": ("corrod",),
+    "hazardous materials remediation": ("hazardous",),
+    "pre-existing": ("preexisting",),
+}
+STEM_SUFFIXES = ("ation", "ing", "ion", "ed", "es", "s", "e", "y")
+SECTION_ACRONYMS = {"HVAC", "GFCI"}
+
+# causes the component clauses do cover ("mechanical and electrical failures")
+COVERED_CAUSES = ("mechanical", "electrical", "malfunction", "failure", "normal use", "age")
+# causes the table has no clause for; an issue naming one goes to retrieval + LLM
+# unless it also names an exclusion
+UNCLASSIFIED_CAUSES = (
+    "flood", "fire", "storm", "lightning", "hail", "wind", "earthquake", "hurricane", "tornado",
+    "freeze", "freezing", "frozen", "power surge", "surge", "pest", "rodent", "animal", "vandalism",
+    "accident", "dropped", "impact", "tree", "water damage", "overload", "misuse", "diy",
+)
+
+
+def _root_dir() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+def default_policy_dir() -> Path:
+    return Path(os.getenv("POLICY_DIR") or _root_dir() / "policies_docs")
+
+def default_table_path() -> Path:
+    return Path(os.getenv("HOMESHIELD_PLAN_TABLE") or _root_dir() / "data" / "plan_table.json")
+
+
+# ------------------------------------------------------------------ parsing --
+
+def _norm(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def _exclusion_keyword(piece: str) -> str:
+    """'Pre-existing failures determined by ...' -> 'pre-existing';
+    short phrases like 'Acts of God' are kept whole."""
+    words = piece.lower().split()
+    return " ".join(words) if len(words) <= 3 else words[0]
+
+def _clause_exclusions(clause: str, component: str) -> List[List[str]]:
+    """[[keyword, label], ...] for the exclusions written inside a component clause:
+    'Pre-existing conditions and improper installation are excluded. Wear
+    items (e.g., filters, belts) are excluded unless otherwise stated.'
+    Examples naming the component itself ('belts' in the Drive Belt clause)
+    are left out: that clause is what states otherwise."""
+    out: List[List[str]] = []
+    own = _norm(component)
+    for m in CLAUSE_EXCLUSION_RE.finditer(re.sub(r"\be\.g\.", "eg", clause, flags=re.IGNORECASE)):
+        examples = EXAMPLES_RE.search(m.group(1))
+        heads = [_norm(p) for p in re.split(r",|\band\b", EXAMPLES_RE.sub("", m.group(1))) if p.strip()]
+        for head in heads:
+            # 'pre-existing conditions' is matched on 'pre-existing'
+            first = head.split()[0]
+            out.append([first if "-" in first else head, head])
+        for ex in re.split(r",|\band\b", examples.group(1)) if examples else ():
+            kw = _norm(ex)
+            if kw and kw.rstrip("s") not in own:
+                out.append([kw, f"{kw} ({heads[-1]})"])
+    return out
+
+def parse_policy(path: str | Path) -> Optional[Dict[str, Any]]:
+    """Extract coverage facts from one LHG_<Plan>_<STATE>_<YEAR>.txt file."""
+    p = Path(path)
+    parts = p.stem.split("_")
+    if len(parts) < 4 or parts[0] != "LHG":
+        return None
+    _, plan, state, year = parts[:4]
+    try:
+        year_i = int(year)
+    except ValueError:
+        return None
+
+    out: Dict[str, Any] = {
+        "plan": plan.title(),
+        "state": state.upper(),
+        "year": year_i,
+        "policy_file": p.name,
+        "terms": {},
+        "components": {},
+        "exclusions": [],
+    }
+    section = ""
+    for lineno, raw in enumerate(p.read_text(encoding="utf-8").splitlines(), 1):
+        line = raw.strip()
+        if not line:
+            continue
+        m = SECTION_RE.match(line)
+        if m:
+            section = m.group(1).strip().upper()
+            continue
+
+        if section == "COVERAGE SUMMARY":
+            m = TERM_RE.match(line)
+            key = TERM_KEYS.get(_norm(m.group(1))) if m else None
+            if key:
+                val = m.group(2).strip()
+                if key in BOOL_TERMS:
+                    out["terms"][key] = [val.lower().startswith("yes"), val, lineno, line]
+                else:
+                    out["terms"][key] = [val, val, lineno, line]
+        elif section == "EXCLUSIONS":
+            if line.startswith("-"):
+                for piece in re.split(r",|\bor\b", line.lstrip("- ")):
+                    if piece.strip():
+                        out["exclusions"].append([_exclusion_keyword(piece.strip()), lineno, line])
+        elif section == "LIMITS AND DEDUCTIBLES":
+            m = ANNUAL_RE.search(line)
+            if m:
+                out["terms"]["annual_limit"] = [f"${m.group(1)}", f"${m.group(1)}", lineno, line]
+        else:
+            m = COMPONENT_RE.match(line)
+            if m:
+                covered = m.group(2).lower() == "covered"
+                out["components"][_norm(m.group(1))] = [covered, m.group(1), section, lineno, line,
+                                                         _clause_exclusions(line, m.group(1))]
+    return out
+
+
+def diff_plans(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """What changes when moving from plan `a` to plan `b` (same state/year)."""
+    a_cov = {k for k, v in a["components"].items() if v[0]}
+    b_cov = {k for k, v in b["components"].items() if v[0]}
+    a_ex = {e[0] for e in a["exclusions"]}
+    b_ex = {e[0] for e in b["exclusions"]}
+    terms = {}
+    for key in TERM_LABELS:
+        av = a["terms"].get(key, [None])[0]
+        bv = b["terms"].get(key, [None])[0]
+        if av != bv:
+            terms[key] = [av, bv]
+    return {
+        "components_gained": sorted(b_cov - a_cov),
+        "components_lost": sorted(a_cov - b_cov),
+        "exclusions_added": sorted(b_ex - a_ex),
+        "exclusions_removed": sorted(a_ex - b_ex),
+        "terms": terms,
+    }
+
+
+# ------------------------------------------------------------------ building --
+
+def build_plan_table(policy_dir: str | Path | None = None) -> Dict[str, Any]:
+    """Parse every policy and diff every plan pair per (state, year).
+    Clause text is interned into one list so repeated clauses are stored once."""
+    texts: List[str] = []
+    text_ids: Dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        i = text_ids.get(s)
+        if i is None:
+            i = text_ids[s] = len(texts)
+            texts.append(s)
+        return i
+
+    groups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for p in sorted(Path(policy_dir or default_policy_dir()).glob("LHG_*.txt")):
+        parsed = parse_policy(p)
+        if parsed:
+            groups.setdefault(f"{parsed['state']}|{parsed['year']}", {})[parsed["plan"]] = parsed
+
+    plans_out: Dict[str, Any] = {}
+    diffs_out: Dict[str, Any] = {}
+    for key, plans in groups.items():
+        plans_out[key] = {
+            name: {
+                "policy_file": p["policy_file"],
+                "terms": {k: [v[0], v[1], v[2], intern(v[3])] for k, v in p["terms"].items()},
+                "components": {k: [v[0], v[1], v[2], v[3], intern(v[4]), v[5]]
+                               for k, v in p["components"].items()},
+                "exclusions": [[kw, ln, intern(t)] for kw, ln, t in p["exclusions"]],
+            }
+            for name, p in plans.items()
+        }
+        diffs_out[key] = {f"{a}>{b}": diff_plans(plans[a], plans[b]) for a, b in permutations(plans, 2)}
+
+    return {"version": TABLE_VERSION, "texts": texts, "plans": plans_out, "diffs": diffs_out}
+
+
+def write_plan_table(policy_dir: str | Path | None = None, out_path: str | Path | None = None) -> Path:
+    table = build_plan_table(policy_dir)
+    out = Path(out_path or default_table_path())
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(table, separators=(",", ":")), encoding="utf-8")
+    load_plan_table.cache_clear()
+    return out
+
+
+@lru_cache(maxsize=1)
+def load_plan_table() -> Dict[str, Any]:
+    """Load the prebuilt table; build it in memory if the job hasn't run yet."""
+    path = default_table_path()
+    try:
+        table = json.loads(path.read_text(encoding="utf-8"))
+        if table.get("version") == TABLE_VERSION:
+            return table
+    except (OSError, ValueError):
+        pass
+    return build_plan_table()
+
+
+# ------------------------------------------------------------------ matching --
+
+def _phrase_re(phrase: str) -> re.Pattern:
+    body = re.escape(phrase[:-1]) + "s?" if phrase.endswith("s") else re.escape(phrase) + "s?"
+    return re.compile(rf"(?<![a-z]){body}(?![a-z])")
+
+@lru_cache(maxsize=4096)
+def _compiled(phrase: str) -> re.Pattern:
+    return _phrase_re(phrase)
+
+def _stem(word: str) -> str:
+    for suf in STEM_SUFFIXES:
+        if word.endswith(suf) and len(word) - len(suf) >= 4:
+            return word[:-len(suf)]
+    return word
+
+@lru_cache(maxsize=1024)
+def _exclusion_res(keyword: str) -> Tuple[re.Pattern, ...]:
+    """Patterns for an exclusion keyword and its EXCLUSION_PHRASES: every word
+    matches by stem, so 'improper installation' finds 'improperly installed'."""
+    out = []
+    for phrase in (keyword,) + EXCLUSION_PHRASES.get(keyword, ()):
+        words = [re.escape(_stem(w)) + "[a-z]*" if len(w) > 3 else re.escape(w) + "s?" for w in phrase.split()]
+        out.append(re.compile(r"(?<![a-z])" + r"\s+".join(words) + r"(?![a-z])"))
+    return tuple(out)
+
+def _find(phrases, text: str) -> Optional[Tuple[int, int]]:
+    for ph in phrases:
+        m = _compiled(ph).search(text)
+        if m:
+            return m.span()
+    return None
+
+NEGATIONS = ("not ", "no ", "isn't ", "wasn't ", "non-", "non ")
+
+def _affirmed(phrase: str, text: str, skip: List[Tuple[int, int]] = (), exclusion: bool = False) -> bool:
+    """True if `phrase` occurs and isn't negated ('not pre-existing'), outside
+    the `skip` spans. Exclusion keywords match by stem (see _exclusion_res)."""
+    patterns = _exclusion_res(phrase) if exclusion else (_compiled(phrase),)
+    return any(not text[:m.start()].endswith(NEGATIONS)
+               and not any(s <= m.start() and m.end() <= e for s, e in skip)
+               for pat in patterns for m in pat.finditer(text))
+
+def _inside(span: Tuple[int, int], phrases, text: str) -> bool:
+    return any(m.start() <= span[0] and span[1] <= m.end()
+               for ph in phrases for m in _compiled(ph).finditer(text))
+
+def _unclassified_causes(text: str, known: List[str]) -> List[str]:
+    """Causes the issue gives ('due to a power surge', 'after the storm')
+    that are neither an exclusion the table knows nor a covered failure."""
+    out = [c.strip() for c in CAUSE_RE.findall(text)
+           if not any(p.search(c) for kw in known for p in _exclusion_res(kw)) and not _find(COVERED_CAUSES, c)]
+    out += [w for w in UNCLASSIFIED_CAUSES if _affirmed(w, text)]
+    return out
+
+def match_topics(issue: str, plan_entry: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Map free text onto component / term / exclusion keys of one plan entry.
+    'clause_exclusions' are exclusions written inside the clauses of the
+    matched components; 'causes' are causes the table can't classify;
+    'unlisted' are appliances no plan lists."""
+    text = _norm(issue)
+    spans: List[Tuple[int, int, str]] = []
+    for comp in plan_entry["components"]:
+        span = next((m.span() for ph in COMPONENT_PHRASES.get(comp, (comp,)) for m in _compiled(ph).finditer(text)
+                     if not _inside(m.span(), NOT_COMPONENT.get(comp, ()), text)), None)
+        if span:
+            spans.append((span[0], span[1], comp))
+    # 'blower motor' wins over 'motor' on the same words
+    kept = [(s, e, c) for s, e, c in spans
+            if not any(s2 <= s and e <= e2 and (e2 - s2) > (e - s) for s2, e2, _ in spans)]
+    # a generic part needs its section in the issue: its title, one of its
+    # appliances ('washer motor') or a SECTION_PHRASES word
+    mentioned = {plan_entry["components"][c][2] for _, _, c in kept if c not in GENERIC_COMPONENTS}
+    mentioned |= {sec for sec in {v[2] for v in plan_entry["components"].values()}
+                  if _find((_norm(sec),) + SECTION_PHRASES.get(sec, ()), text)}
+    kept = [(s, e, c) for s, e, c in kept
+            if c not in GENERIC_COMPONENTS or plan_entry["components"][c][2] in mentioned]
+    components = [c for _, _, c in kept]
+    # a named system ("plumbing leak") stands for its whole section, unless
+    # a component of that section was already named
+    named = {plan_entry["components"][c][2] for c in components}
+    all_sections = {v[2] for v in plan_entry["components"].values()}
+    sections = sorted(sec for sec in all_sections
+                      if sec not in named and _find((_norm(sec),), text))
+    terms = [k for k, phrases in TERM_PHRASES.items() if _find(phrases, text)]
+    exclusions = sorted({kw for kw, _, _ in plan_entry["exclusions"] if _affirmed(kw, text, exclusion=True)})
+    clause_kws = {kw for c in plan_entry["components"].values() for kw, _ in c[5]}
+    in_scope = [plan_entry["components"][c] for c in components]
+    in_scope += [c for c in plan_entry["components"].values() if c[2] in sections]
+    # 'belts' in 'drive belt snapped' names the component, not a wear item
+    comp_spans = [(s, e) for s, e, _ in kept]
+    clause_exclusions = sorted({kw for c in in_scope for kw, _ in c[5]
+                                if _affirmed(kw, text, comp_spans, exclusion=True)})
+    known = [kw for kw, _, _ in plan_entry["exclusions"]] + sorted(clause_kws)
+    return {"components": components, "sections": sections, "terms": terms, "exclusions": exclusions,
+            "clause_exclusions": clause_exclusions, "causes": _unclassified_causes(text, known),
+            "unlisted": [a for a in UNLISTED_APPLIANCES if _find((a,), text)]}
+
+
+def _citation(entry: Dict[str, Any], texts: List[str], line: int, text_id: int) -> Dict[str, Any]:
+    return {"source": entry["policy_file"], "page": 1, "line": line, "text": texts[text_id]}
+
+def _section_label(section: str) -> str:
+    return section if section in SECTION_ACRONYMS else section.title()
+
+def _excluded_by_clause(c: List[Any], topics: Dict[str, List[str]]) -> List[str]:
+    """Labels of the exclusions in component clause `c` the issue describes."""
+    return list(dict.fromkeys(label for kw, label in c[5] if kw in topics.get("clause_exclusions", ())))
+
+def _plan_verdict(topics, entry, current, texts) -> Dict[str, Any]:
+    covered = True
+    reasons: List[str] = []
+    cites: List[Dict[str, Any]] = []
+
+    for kw in topics["exclusions"]:
+        for ex_kw, line, tid in entry["exclusions"]:
+            if ex_kw == kw:
+                covered = False
+                reasons.append(f"'{kw}' is excluded")
+                cites.append(_citation(entry, texts, line, tid))
+                break
+
+    for comp in topics["components"]:
+        c = entry["components"].get(comp)
+        excluded = _excluded_by_clause(c, topics) if c is not None else []
+        if c is None or not c[0]:
+            covered = False
+            reasons.append(f"{comp.title()} is not covered")
+        elif excluded:
+            covered = False
+            reasons.append(f"The {c[1]} clause excludes {' and '.join(excluded)}")
+        else:
+            reasons.append(f"{c[1]} is covered ({_section_label(c[2])})")
+        if c is not None:
+            cites.append(_citation(entry, texts, c[3], c[4]))
+
+    for sec in topics["sections"]:
+        comps = [c for c in entry["components"].values() if c[2] == sec]
+        missing = [c for c in comps if not c[0]]
+        excluded = [c for c in comps if c[0] and _excluded_by_clause(c, topics)]
+        label = _section_label(sec)
+        if excluded and not missing:
+            covered = False
+            labels = dict.fromkeys(x for c in excluded for x in _excluded_by_clause(c, topics))
+            reasons.append(f"The {label} clauses exclude {' and '.join(labels)}")
+            missing = excluded
+        elif not comps or missing:
+            covered = False
+            reasons.append(f"{label} is only partly covered" if comps else f"{label} is not covered")
+        else:
+            reasons.append(f"{label} components are covered")
+        for c in (missing or comps[:1]):
+            cites.append(_citation(entry, texts, c[3], c[4]))
+
+    for key in topics["terms"]:
+        t = entry["terms"].get(key)
+        if t is None:
+            continue
+        cur = (current or {}).get("terms", {}).get(key)
+        note = f" (yours: {cur[1]})" if cur and cur[0] != t[0] else ""
+        if key in BOOL_TERMS and not t[0]:
+            covered = False
+        reasons.append(f"{TERM_LABELS[key]}: {t[1]}{note}")
+        cites.append(_citation(entry, texts, t[2], t[3]))
+
+    return {"covered": covered, "reason": "; ".join(reasons) + ".", "citations": cites}
+
+
+def evaluate_from_table(issue: str, current_plan: str, state: str, year: int,
+                        table: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    One candidate per other plan in the same state/year, shaped like
+    upgrades.suggest_alternative_plans output plus a 'differences' key.
+    None means the table can't answer (unknown state/year, nothing in the
+    issue maps onto a component, term or exclusion, or the issue gives a
+    cause the table can't classify or names an appliance it doesn't list)
+    and the caller should fall back to retrieval + LLM.
+    """
+    table = table or load_plan_table()
+    plans = table["plans"].get(f"{(state or '').upper().strip()}|{int(year)}")
+    if not plans:
+        return None
+    current_name = next((p for p in plans if p.lower() == (current_plan or "").lower()), None)
+    current = plans.get(current_name) if current_name else None
+
+    topics = match_topics(issue, current or next(iter(plans.values())))
+    if topics["causes"] or topics["unlisted"] or not any(topics.values()):
+        return None
+
+    diffs = table["diffs"].get(f"{(state or '').upper().strip()}|{int(year)}", {})
+    out = []
+    for name, entry in plans.items():
+        if name == current_name:
+            continue
+        cand = _plan_verdict(topics, entry, current, table["texts"])
+        cand["plan"] = name
+        cand["covered_raw"] = "yes" if cand["covered"] else "no"
+        cand["differences"] = diffs.get(f"{current_name}>{name}") if current_name else None
+        out.append(cand)
+    return out
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    path = write_plan_table(args[0] if args else None, args[1] if len(args) > 1 else None)
+    print(f"Wrote {path}")
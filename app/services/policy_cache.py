@@ -0,0 +1,172 @@
+# app/services/policy_cache.py
+"""
+Per-customer policy pinning.
+
+Once a customer is loaded we know their exact policy file, and a policy is
+only ~9 KB / a dozen chunks. `pin_policy` chunks that file the way ingestion
+does and embeds the chunks once; `PinnedPolicy.retrieve` then ranks them
+locally (one matrix-vector product + MMR) instead of sending a filtered
+query to the remote index every turn. Questions naming another plan still
+go to the remote index, filtered to that plan; upgrade or comparison wording
+without one is answered from the pinned policy, which is what the remote
+query would have been filtered to anyway. Only plans with a policy for the
+customer's state and year count, and only when the question calls it a plan
+or compares plans.
+
+Chunks are numbered like ingestion numbers them (across the policy
+directory, in glob order), so page citations and chunk ids match the
+remote path for an index built from the same directory.
+
+Pinned policies are shared per file across sessions (HOMESHIELD_PIN_CACHE
+files, default 64); HOMESHIELD_PIN_POLICY=0 turns pinning off.
+"""
+from __future__ import annotations
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .. import scheduler, telemetry
+from ..config import settings
+from ..singleflight import SingleFlight
+from . import rag
+from .ingestion import _parse_meta_from_filename, text_splitter
+from .upgrades import discover_plans
+
+if TYPE_CHECKING:
+    import numpy as np
+    from langchain_core.documents import Document
+
+# a plan name only reroutes a question that names it as a plan ("the Gold
+# plan") or compares plans; 'gold-plated' or 'premium' alone stay local
+COMPARISON_RE = re.compile(
+    r"\b(upgrad\w*|switch\w*|chang\w* to|mov\w* to|compar\w*|vs\.?|versus|instead|than|differ\w*)\b",
+    re.IGNORECASE,
+)
+
+pin_flight = SingleFlight("pin", scope=scheduler.current_priority, rerun_on=scheduler.CALLER_ERRORS)
+_cache: "OrderedDict[Tuple[str, int], PinnedPolicy]" = OrderedDict()
+_cache_lock = threading.Lock()
+_offsets: Optional[Tuple[Tuple, Dict[str, int]]] = None  # (directory key, file -> first chunk index)
+
+
+def pinning_enabled() -> bool:
+    return os.getenv("HOMESHIELD_PIN_POLICY", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+class PinnedPolicy:
+    def __init__(self, policy_file: str, plan: str, state: str, year: Optional[int],
+                 docs: List["Document"], vectors: "np.ndarray") -> None:
+        import numpy as np
+
+        self.policy_file = policy_file
+        self.plan = plan
+        self.state = state
+        self.year = year
+        self.docs = docs
+        others = discover_plans(state, year, exclude_plan=plan) if year is not None else []
+        # 'gold-plated' names no plan
+        self._plan_re = re.compile(r"\b(" + "|".join(map(re.escape, others)) + r")\b(?!-)(\s+(?:plan|tier)\b)?",
+                                   re.IGNORECASE) if others else None
+        v = np.asarray(vectors, dtype=np.float32)
+        self._vecs = v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def remote_plan(self, query: str) -> Optional[str]:
+        """The other plan (one with a policy for this state/year) a question
+        asks about, to be answered from the remote index, or None to stay
+        local."""
+        if self._plan_re is None:
+            return None
+        comparing = COMPARISON_RE.search(query) is not None
+        for m in self._plan_re.finditer(query):
+            if m.group(2) or comparing:
+                return m.group(1).title()
+        return None
+
+    def search(self, query_vec, k: int = 8, fetch_k: int = rag.FETCH_K,
+               lambda_mult: float = 0.5) -> List[Tuple["Document", float]]:
+        """Top fetch_k chunks by cosine similarity, MMR'd down to k."""
+        import numpy as np
+        from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        scores = self._vecs @ q
+        top = np.argsort(-scores)[:fetch_k]
+        picked = maximal_marginal_relevance(q, self._vecs[top], lambda_mult=lambda_mult, k=min(k, len(top)))
+        return [(self.docs[top[i]], float(scores[top[i]])) for i in picked]
+
+    def retrieve(self, query: str, k: int = 8) -> List["Document"]:
+        """Drop-in for rag.retrieve_chunks on this customer's policy."""
+        other = self.remote_plan(query)
+        if other is not None:
+            return rag.retrieve_chunks(query, other, self.state, self.year, k=k)
+        with telemetry.span("retrieve", plan=self.plan, state=self.state, year=self.year, k=k, pinned=True) as sp:
+            with telemetry.span("embed.query"):
+                vec = rag.embedding_flight.do(query, rag._embed_query, query)
+            with telemetry.span("local.rank", chunks=len(self.docs)):
+                docs = [d for d, _ in self.search(vec, k=k)]
+            sp.set(returned=len(docs))
+            return docs
+
+
+def pin_policy(policy_file: str, plan: str, state: str, year: Optional[int],
+               policy_dir: Optional[str] = None) -> Optional[PinnedPolicy]:
+    """Load, chunk and embed one policy file, or None if pinning is off or
+    the file isn't available locally (callers then use the remote index)."""
+    if not (pinning_enabled() and policy_file):
+        return None
+    path = Path(policy_dir or settings.POLICY_DIR) / os.path.basename(str(policy_file))
+    if not path.is_file():
+        return None
+    key = (str(path.resolve()), path.stat().st_mtime_ns)
+    with _cache_lock:
+        pinned = _cache.get(key)
+        if pinned is not None:
+            _cache.move_to_end(key)
+            return pinned
+    pinned = pin_flight.do(key, _build, path, plan, state, year)
+    if pinned is None:
+        return None
+    with _cache_lock:
+        _cache[key] = pinned
+        while len(_cache) > int(os.getenv("HOMESHIELD_PIN_CACHE", "64")):
+            _cache.popitem(last=False)
+    return pinned
+
+
+def _ingestion_offsets(policy_dir: Path) -> Dict[str, int]:
+    """Index of each file's first chunk when ingestion splits the whole
+    directory (load_and_chunk numbers chunks, and so pages, across files)."""
+    global _offsets
+    files = list(policy_dir.glob("*.txt"))
+    key = (str(policy_dir.resolve()), tuple((p.name, p.stat().st_mtime_ns) for p in files))
+    cached = _offsets
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    splitter, start, out = text_splitter(), 0, {}
+    for p in files:
+        out[p.name] = start
+        start += len(splitter.split_text(p.read_text(encoding="utf-8")))
+    _offsets = (key, out)
+    return out
+
+
+def _build(path: Path, plan: str, state: str, year: Optional[int]) -> Optional[PinnedPolicy]:
+    with telemetry.span("policy.pin", policy_file=path.name) as sp:
+        meta = {**_parse_meta_from_filename(str(path)), "source": path.name, "section": "policy"}
+        docs = text_splitter().create_documents([path.read_text(encoding="utf-8")], metadatas=[meta])
+        first = _ingestion_offsets(path.parent).get(path.name, 0)
+        for i, d in enumerate(docs, first):
+            d.metadata["page"] = (i // 5) + 1
+            d.metadata["chunk_id"] = f"{path.name}-{i:04d}"
+        if not docs:
+            return None
+        vectors = rag.embeddings().embed_documents([d.page_content for d in docs])
+        sp.set(chunks=len(docs))
+    return PinnedPolicy(path.name, plan, state, year, docs, vectors)
@@ -1,15 +1,110 @@
 # app/services/rag.py
+import logging
 import os
-from ..vectorstore import vectorstore, chat_client
+from .. import scheduler, telemetry
+from ..batching import batching_enabled, get_dispatcher
+from ..chunkstore import MissingChunks, chunk_store
+from ..config import settings
+from ..singleflight import SingleFlight
+from ..vectorstore import embeddings, pinecone_index, chat_client
+
+log = logging.getLogger(__name__)
+
+FETCH_K = 24
+
+# Adaptive depth (retrieve_scored_chunks). Scores are the index's cosine
+# similarities, so the right threshold depends on the embedding model.
+ADAPTIVE_DEFAULT = os.getenv("HOMESHIELD_ADAPTIVE_K", "").strip().lower() in ("1", "true", "yes", "on")
+MIN_SCORE = float(os.getenv("HOMESHIELD_MIN_SCORE", "0.30"))    # drop anything below, past the top MIN_K
+SCORE_GAP = float(os.getenv("HOMESHIELD_SCORE_GAP", "0.04"))    # cut k at a drop this large
+MIN_K = int(os.getenv("HOMESHIELD_MIN_K", "2"))                 # ...but never below this
+CLEAR_MARGIN = float(os.getenv("HOMESHIELD_CLEAR_MARGIN", "0.08"))  # first pass: skip MMR past this
+FIRST_PASS_DEFAULT = os.getenv("HOMESHIELD_FIRST_PASS", "").strip().lower() in ("1", "true", "yes", "on")
 
 SYSTEM = (
   "You are HomeShield AI. Answer strictly from the provided policy chunks. "
   "Cite specific clauses. If not covered, say 'Not covered' and why."
 )
 
-def retrieve_chunks(query: str, plan: str, state: str, year: int | None, k=8, policy_source: str | None = None):
-    vs = vectorstore()
+# Identical retrievals that overlap in time share one call. Embeddings are
+# coalesced on the query text alone: upgrades.py asks the same question of
+# several plans at once, and only the filter differs between those searches.
+# Calls are only shared within a priority class, so interactive work never
+# waits behind (or is shed with) a background caller's call.
+retrieval_flight = SingleFlight("retrieve", scope=scheduler.current_priority, rerun_on=scheduler.CALLER_ERRORS)
+embedding_flight = SingleFlight("embed", scope=scheduler.current_priority, rerun_on=scheduler.CALLER_ERRORS)
+
+def _retrieval_key(query, plan, state, year, k, policy_source):
+    return (
+        query, plan, state,
+        None if year is None else int(year),
+        int(k),
+        os.path.basename(str(policy_source)) if policy_source else None,
+    )
+
+def retrieve_chunks(query: str, plan: str, state: str, year: int | None, k=8, policy_source: str | None = None,
+                    adaptive: bool | None = None):
+    """Up to k policy chunks for the query. With adaptive=True (default from
+    HOMESHIELD_ADAPTIVE_K) k is an upper bound; see retrieve_scored_chunks."""
+    if ADAPTIVE_DEFAULT if adaptive is None else adaptive:
+        return [d for d, _ in retrieve_scored_chunks(query, plan, state, year, k=k, policy_source=policy_source)]
+    key = _retrieval_key(query, plan, state, year, k, policy_source)
+    with telemetry.span("retrieve", plan=plan, state=state, year=year, k=k) as sp:
+        docs = retrieval_flight.do(key, _retrieve_chunks, query, plan, state, year, k, policy_source)
+        sp.set(returned=len(docs))
+        return list(docs)  # callers may share the result; hand each its own list
+
+async def aretrieve_chunks(query: str, plan: str, state: str, year: int | None, k=8, policy_source: str | None = None):
+    """asyncio flavour of retrieve_chunks; joins in-flight thread calls too."""
+    key = _retrieval_key(query, plan, state, year, k, policy_source)
+    with telemetry.span("retrieve", plan=plan, state=state, year=year, k=k) as sp:
+        docs = await retrieval_flight.do_async(key, _retrieve_chunks, query, plan, state, year, k, policy_source)
+        sp.set(returned=len(docs))
+        return list(docs)
+
+def retrieve_scored_chunks(query: str, plan: str, state: str, year: int | None, k=8,
+                           policy_source: str | None = None, first_pass: bool | None = None):
+    """
+    Adaptive-depth retrieval returning [(Document, score), ...], best first.
+    - Matches under MIN_SCORE are dropped (but the best MIN_K are always
+      kept), and the list is cut at the largest score drop if it is at
+      least SCORE_GAP (see choose_k); MMR then picks that many chunks out
+      of fetch_k as usual.
+    - With first_pass (default from HOMESHIELD_FIRST_PASS) a cheap top-k
+      search without vectors runs first; when its cut is at least
+      CLEAR_MARGIN, or no more than the kept matches clear MIN_SCORE, the
+      top results are what MMR would pick and are returned as-is,
+      otherwise it costs one extra index round trip.
+    """
+    if first_pass is None:
+        first_pass = FIRST_PASS_DEFAULT
+    key = ("scored", first_pass) + _retrieval_key(query, plan, state, year, k, policy_source)
+    with telemetry.span("retrieve", plan=plan, state=state, year=year, k=k, adaptive=True) as sp:
+        pairs = retrieval_flight.do(key, _retrieve_scored, query, plan, state, year, k, policy_source, first_pass)
+        sp.set(returned=len(pairs))
+        return list(pairs)
 
+def choose_k(scores, k_max: int, k_min: int = MIN_K, min_score: float = MIN_SCORE, min_gap: float = SCORE_GAP):
+    """
+    How many of the (descending) scores to keep, and the score drop right
+    after the last kept one (0.0 when nothing was cut on a gap). The top
+    k_min are kept even under min_score, so only an empty list gives 0.
+    """
+    k_min = max(1, k_min)
+    top = list(scores)[:k_max]
+    s = top[:max(k_min, sum(1 for x in top if x >= min_score))]
+    if not s:
+        return 0, 0.0
+    n, gap = len(s), 0.0
+    if n > k_min:
+        drop, cut = max((s[i] - s[i + 1], i + 1) for i in range(k_min - 1, n - 1))
+        if drop >= min_gap:
+            n, gap = cut, drop
+    if n == len(s) and len(scores) > n and n < k_max:
+        gap = s[-1] - scores[n]  # everything past n fell under min_score
+    return n, gap
+
+def _meta_filter(plan, state, year, policy_source):
     clauses = [
         {"plan": {"$eq": plan}},
         {"state": {"$eq": state}},
@@ -22,11 +117,99 @@ def retrieve_chunks(query: str, plan: str, state: str, year: int | None, k=8, po
     if policy_source:
         clauses.append({"source": {"$eq": os.path.basename(str(policy_source))}})
 
-    meta_filter = {"$and": clauses}
+    return {"$and": clauses}
+
+def _retrieve_scored(query, plan, state, year, k, policy_source, first_pass):
+    meta_filter = _meta_filter(plan, state, year, policy_source)
+    with telemetry.span("embed.query"):
+        vec = embedding_flight.do(query, _embed_query, query)
+    if first_pass:
+        with telemetry.span("vector.search", fetch_k=k, values=False) as sp:
+            top = _search(vec, k, meta_filter, include_values=False)
+            sp.set(matches=len(top))
+        n, gap = choose_k([m.score for m in top], k_max=k, k_min=MIN_K, min_score=MIN_SCORE, min_gap=SCORE_GAP)
+        # with no more than n matches over MIN_SCORE, MMR would pick the top n anyway
+        above = sum(m.score >= MIN_SCORE for m in top)
+        if n == 0 or gap >= CLEAR_MARGIN or above <= n and above < k:
+            with telemetry.span("chunks.fetch", k=n, first_pass=True):
+                return _to_documents(top[:n], with_scores=True)
+    with telemetry.span("vector.search", fetch_k=FETCH_K) as sp:
+        matches = _search(vec, FETCH_K, meta_filter)
+        sp.set(matches=len(matches))
+    n, _ = choose_k([m.score for m in matches], k_max=k, k_min=MIN_K, min_score=MIN_SCORE, min_gap=SCORE_GAP)
+    # matches come best first; the top n stay candidates even under MIN_SCORE
+    pool = [m for i, m in enumerate(matches) if i < n or m.score >= MIN_SCORE]
+    picked = sorted(_mmr(vec, pool, n, lambda_mult=0.5), key=lambda m: -m.score) if n else []
+    with telemetry.span("chunks.fetch", k=len(picked)):
+        return _to_documents(picked, with_scores=True)
+
+def _retrieve_chunks(query, plan, state, year, k, policy_source):
+    meta_filter = _meta_filter(plan, state, year, policy_source)
+
+    # embed and search separately so each shows up as its own stage
+    with telemetry.span("embed.query"):
+        vec = embedding_flight.do(query, _embed_query, query)
+    with telemetry.span("vector.search", fetch_k=FETCH_K) as sp:
+        matches = _search(vec, FETCH_K, meta_filter)
+        sp.set(matches=len(matches))
+    picked = _mmr(vec, matches, k, lambda_mult=0.5)
+    with telemetry.span("chunks.fetch", k=len(picked)):
+        return _to_documents(picked)
 
-    return vs.max_marginal_relevance_search(
-        query, k=k, fetch_k=24, lambda_mult=0.5, filter=meta_filter
+def _embed_query(query: str):
+    # with batching on, concurrent queries share one embed_documents request
+    if batching_enabled():
+        return get_dispatcher().embed_query(query)
+    return embeddings().embed_query(query)
+
+def _search(vec, top_k: int, meta_filter, include_values: bool = True):
+    """Raw index query. Values are only needed for MMR; metadata is ids +
+    filter fields (text lives in the local chunk store)."""
+    res = pinecone_index().query(
+        vector=vec, top_k=top_k, filter=meta_filter,
+        namespace=settings.PINECONE_NAMESPACE,
+        include_values=include_values, include_metadata=True,
+    )
+    return list(res.matches or [])
+
+def _mmr(vec, matches, k: int, lambda_mult: float):
+    if not matches:
+        return []
+    import numpy as np
+    from langchain_core.vectorstores.utils import maximal_marginal_relevance
+    idx = maximal_marginal_relevance(
+        np.array(vec, dtype=np.float32), [m.values for m in matches], k=k, lambda_mult=lambda_mult
     )
+    return [matches[i] for i in idx]
+
+def _to_documents(matches, with_scores: bool = False):
+    from langchain_core.documents import Document
+    # indexes built before the chunk store still carry text in metadata
+    wanted = [m.metadata.get("chunk_id") for m in matches if "text" not in (m.metadata or {})]
+    store = chunk_store() if wanted else None
+    texts = store.get_many([c for c in wanted if c]) if store is not None else {}
+    docs, missing = [], []
+    for m in matches:
+        meta = dict(m.metadata or {})
+        text = meta.pop("text", None) or texts.get(meta.get("chunk_id"))
+        if text is None:
+            missing.append(meta.get("chunk_id") or m.id)
+            continue
+        doc = Document(page_content=text, metadata=meta)
+        docs.append((doc, float(m.score)) if with_scores else doc)
+    if missing:
+        sp = telemetry.current()
+        if sp is not None:
+            sp.set(missing=len(missing))
+        log.warning("%d of %d matched chunks are not in the chunk store at %s: %s",
+                    len(missing), len(matches), store.path if store is not None else "?", ", ".join(map(str, missing[:5])))
+        # an empty answer here would read as "no relevant clauses" and deny the claim
+        if not docs:
+            raise MissingChunks(
+                f"The index matched {len(missing)} chunks but none are in the chunk store at "
+                f"{store.path if store is not None else '?'}; run ingestion on this host or set HOMESHIELD_CHUNK_STORE."
+            )
+    return docs
 
 def format_citations(docs):
     return [{
@@ -45,4 +228,7 @@ def answer_with_context(question: str, docs):
         {"role":"system","content":SYSTEM},
         {"role":"user","content":f"Question:\n{question}\n\nContext:\n{context}"}
     ]
-    return llm.invoke(msg).content.strip()
+    with telemetry.span("llm.answer", chunks=len(docs)) as sp:
+        resp = llm.invoke(msg)
+        sp.record_usage(resp)
+    return resp.content.strip()
@@ -1,6 +1,7 @@
 # app/services/router.py
 import json
 from typing import List, Dict
+from .. import telemetry
 from ..vectorstore import chat_client
 
 INTENTS = ["coverage", "claim_process", "claim_eval", "upgrade", "smalltalk", "other"]
@@ -34,7 +35,10 @@ def detect_intent(history: List[Dict[str, str]], user_msg: str) -> Dict:
         "Be decisive; prefer claim_process for 'how do I apply/submit file a claim' questions."
     )
     user = f"Conversation so far:\n{hist_txt}\n\nUser now says:\n{user_msg}\n\nRespond with JSON only."
-    raw = llm.invoke([{"role":"system","content":sys},{"role":"user","content":user}]).content
+    with telemetry.span("llm.intent") as sp:
+        resp = llm.invoke([{"role":"system","content":sys},{"role":"user","content":user}])
+        sp.record_usage(resp)
+    raw = resp.content
     try:
         data = json.loads(_strip_fences(raw))
         intent = data.get("intent","other")
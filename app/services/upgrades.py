@@ -1,8 +1,9 @@
 # app/services/upgrades.py
 """
 Suggest alternative plans that might cover an issue.
-Searches other plans in the same state/year and reuses the same
-coverage decision logic as claims.py (exclusion-first + LLM fallback).
+Answers from the precomputed plan table (plan_diffs.py) when the issue names
+a known component, plan term or exclusion; otherwise searches other plans in
+the same state/year and reuses the LLM verdict from claims.py.
 """
 
 from __future__ import annotations
@@ -11,12 +12,9 @@ from typing import List, Dict
 import os
 
 from .rag import retrieve_chunks, format_citations
-from .claims import (
-    EXCLUDED_PATTERNS,
-    COVERED_PATTERNS,
-    _any_match,
-    _structured_llm_verdict,
-)
+from .. import telemetry
+from .claims import _structured_llm_verdict
+from .plan_diffs import evaluate_from_table
 
 # Simple rank to show higher tiers first if present.
 PLAN_RANK: Dict[str, int] = {
@@ -79,33 +77,35 @@ def suggest_alternative_plans(
     the best candidates that DO cover it, including citations.
     If none are found covered, return top few NOT covered so the UI can explain why.
     """
+    with telemetry.request("suggest_alternative_plans", plan=current_plan, state=state, year=year):
+        return _suggest_alternative_plans(issue, current_plan, state, year, limit)
+
+def _suggest_alternative_plans(issue: str, current_plan: str, state: str, year: int, limit: int) -> List[Dict]:
+    with telemetry.span("upgrades.table_lookup") as sp:
+        candidates = evaluate_from_table(issue, current_plan, state, year)
+        sp.set(hit=candidates is not None)
+    if candidates is None:
+        candidates = _retrieval_candidates(issue, current_plan, state, year)
+    return _rank_candidates(candidates, limit)
+
+def _retrieval_candidates(issue: str, current_plan: str, state: str, year: int) -> List[Dict]:
     candidates: List[Dict] = []
     for plan in discover_plans(state, year, exclude_plan=current_plan):
         docs = retrieve_chunks(issue, plan, state, year, k=8)
         if not docs:
             continue
 
-        joined = " ".join(d.page_content for d in docs)
-
-        has_excl = _any_match(EXCLUDED_PATTERNS, joined)
-        has_cov  = _any_match(COVERED_PATTERNS, joined)
-
-        if has_excl and not has_cov:
-            covered = False
-            reason = "Policy excerpts show an explicit exclusion."
-        elif has_cov and not has_excl:
-            covered = True
-            reason = "Policy excerpts indicate this item is covered."
-        else:
-            covered, reason = _structured_llm_verdict(issue, docs)
-
+        verdict = _structured_llm_verdict(issue, docs)
         candidates.append({
             "plan": plan,
-            "covered": covered,
-            "reason": reason,
+            "covered": verdict["covered"],
+            "covered_raw": verdict["covered_raw"],
+            "reason": verdict["reason"],
             "citations": format_citations(docs),
         })
+    return candidates
 
+def _rank_candidates(candidates: List[Dict], limit: int) -> List[Dict]:
     if not candidates:
         return []
 
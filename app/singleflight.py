@@ -0,0 +1,119 @@
+# app/singleflight.py
+"""
+Request coalescing ("single flight") for expensive idempotent calls.
+
+Concurrent callers asking for the same key share one in-flight computation:
+the first caller (the leader) runs it, everyone else waits for its result or
+exception. Nothing is cached once the call finishes, so results are never
+stale; this only removes duplicate work that overlaps in time.
+
+Threads and asyncio share the same table, so a coroutine can join a call
+that a worker thread started and vice versa.
+
+`scope` adds the caller's context to the key (callers in different scopes
+never share a call), and a follower whose leader failed with one of
+`rerun_on` (failures that belong to the leader, not the call) runs the call
+itself instead of inheriting the error.
+"""
+from __future__ import annotations
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+
+class SingleFlight:
+    def __init__(self, name: str = "", scope: Optional[Callable[[], Hashable]] = None,
+                 rerun_on: Tuple[Type[BaseException], ...] = ()) -> None:
+        self.name = name
+        self.scope = scope
+        self.rerun_on = rerun_on
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: set = set()  # detached do_async computations
+        self.executed = 0  # calls that actually ran
+        self.shared = 0    # calls that piggy-backed on an in-flight one
+
+    def _join(self, key: Hashable):
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self.shared += 1
+                return fut, False
+            fut = self._calls[key] = Future()
+            self.executed += 1
+            return fut, True
+
+    def _key(self, key: Hashable) -> Hashable:
+        return (self.scope(), key) if self.scope is not None else key
+
+    def _settle(self, key: Hashable, fut: Future, result: Any = None, exc: BaseException | None = None) -> None:
+        # drop the key first so late arrivals start a fresh call
+        with self._lock:
+            self._calls.pop(key, None)
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless an identical call is already in flight."""
+        key = self._key(key)
+        fut, leader = self._join(key)
+        if not leader:
+            try:
+                return fut.result()
+            except self.rerun_on:
+                return fn(*args, **kwargs)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._settle(key, fut, exc=e)
+            raise
+        self._settle(key, fut, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Async variant. Coroutine functions are awaited; plain callables run
+        in a worker thread so the event loop is not blocked. The call runs as
+        its own task and every caller awaits it shielded, so cancelling one
+        caller (the leader included) doesn't cancel the others."""
+        import asyncio, inspect  # kept off the import path of sync-only callers
+
+        async def run():
+            if inspect.iscoroutinefunction(fn):
+                return await fn(*args, **kwargs)
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+        async def lead():
+            try:
+                result = await run()
+            except BaseException as e:
+                self._settle(key, fut, exc=e)
+            else:
+                self._settle(key, fut, result)
+
+        key = self._key(key)
+        fut, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(lead())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            return await asyncio.shield(asyncio.wrap_future(fut))
+        except self.rerun_on:
+            if leader:
+                raise
+            return await run()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.executed = 0
+            self.shared = 0
@@ -0,0 +1,350 @@
+# app/telemetry.py
+"""
+Lightweight tracing and metrics for the service layer.
+
+    with telemetry.request("chat_turn", customer="C00042"):
+        with telemetry.span("llm.answer") as sp:
+            resp = llm.invoke(msg)
+            sp.record_usage(resp)
+
+When tracing is off (the default) `span()`/`request()` return a shared no-op
+object, so instrumented code pays one global lookup per call site.
+
+Environment (read on first use, after .env is loaded):
+  HOMESHIELD_TRACE=1                 enable spans + metrics
+  HOMESHIELD_TRACE_FILE=path.jsonl   append one JSON line per finished span
+  HOMESHIELD_PROFILE_SAMPLE=0.01     cProfile this fraction of requests
+  HOMESHIELD_PROFILE_DIR=dir         where sampled profiles are dumped
+"""
+from __future__ import annotations
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+# None until _load_settings(): this module is imported before the entry
+# points load .env, so the environment is read when tracing is first asked about
+_enabled: Optional[bool] = None
+_jsonl_path: Optional[str] = None
+_profile_rate: Optional[float] = None
+_profile_dir = "profiles"
+
+_lock = threading.Lock()
+_current: ContextVar[Optional["Span"]] = ContextVar("homeshield_span", default=None)
+_recent: Deque[Dict[str, Any]] = deque(maxlen=2048)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _load_settings() -> bool:
+    global _enabled, _jsonl_path, _profile_rate, _profile_dir
+    from . import config  # noqa: F401  (loads .env)
+    with _lock:
+        if _enabled is None:
+            _enabled = os.getenv("HOMESHIELD_TRACE", "").strip().lower() in _TRUTHY
+            _jsonl_path = _jsonl_path or os.getenv("HOMESHIELD_TRACE_FILE") or None
+            if _profile_rate is None:
+                _profile_rate = float(os.getenv("HOMESHIELD_PROFILE_SAMPLE", "0") or 0)
+            _profile_dir = os.getenv("HOMESHIELD_PROFILE_DIR", _profile_dir)
+        return _enabled
+
+
+class _StageMetrics:
+    __slots__ = ("count", "errors", "seconds", "buckets", "prompt_tokens", "completion_tokens")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+_metrics: Dict[str, _StageMetrics] = {}
+
+
+# --------------------------------------------------------------------- spans --
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def add_tokens(self, prompt: int = 0, completion: int = 0) -> None:
+        pass
+
+    def record_usage(self, response: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """A timed stage. Token counts roll up into the enclosing request span."""
+
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent", "root",
+                 "start", "duration_ms", "prompt_tokens", "completion_tokens",
+                 "error", "stages", "_token", "_profiler")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.parent = _current.get()
+        self.root = self.parent.root if self.parent else self
+        self.trace_id = self.parent.trace_id if self.parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.error: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.duration_ms = 0.0
+        self._profiler = None
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration_ms = (time.perf_counter() - self.start) * 1000.0
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        if self.root is not self:
+            stages = self.root.stages
+            stages[self.name] = stages.get(self.name, 0.0) + self.duration_ms
+        _finish(self)
+        return False
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def add_tokens(self, prompt: int = 0, completion: int = 0) -> None:
+        s: Optional[Span] = self
+        while s is not None:
+            s.prompt_tokens += prompt
+            s.completion_tokens += completion
+            s = s.parent
+
+    def record_usage(self, response: Any) -> None:
+        """Pull token counts off a langchain chat response, if it has any."""
+        usage = token_usage(response)
+        if usage:
+            self.add_tokens(*usage)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "ts": time.time() - self.duration_ms / 1000.0,
+            "duration_ms": round(self.duration_ms, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+        if self.root is self and self.stages:
+            out["stages"] = {k: round(v, 3) for k, v in self.stages.items()}
+        return out
+
+
+def token_usage(response: Any) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens reported on a langchain chat response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+    meta = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if meta:
+        return int(meta.get("prompt_tokens", 0)), int(meta.get("completion_tokens", 0))
+    return None
+
+
+def span(name: str, **attrs):
+    """Time a stage (LLM call, embedding, vector query, ...)."""
+    if not (_enabled if _enabled is not None else _load_settings()):
+        return _NOOP
+    return Span(name, attrs)
+
+
+class _RequestSpan(Span):
+    """Root span that may also run the sampling profiler for its duration."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "Span":
+        super().__enter__()
+        if self.parent is None and _profile_rate and random.random() < _profile_rate:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        prof = self._profiler
+        if prof is not None:
+            prof.disable()
+        super().__exit__(exc_type, exc, tb)
+        if prof is not None:
+            try:
+                _profile_hook(self, prof)
+            except Exception:
+                pass
+        return False
+
+
+def request(name: str, **attrs):
+    """Top-level unit of work (chat turn, claim evaluation, API call).
+    Nested inside another span it behaves like a plain span."""
+    if not (_enabled if _enabled is not None else _load_settings()):
+        return _NOOP
+    return _RequestSpan(name, attrs)
+
+
+def current() -> Optional[Span]:
+    return _current.get() if (_enabled if _enabled is not None else _load_settings()) else None
+
+
+# ------------------------------------------------------------------ profiler --
+
+def _dump_profile(root: Span, profiler) -> None:
+    out = Path(_profile_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(out / f"{root.name}-{root.trace_id}.prof"))
+
+
+_profile_hook: Callable[[Span, Any], None] = _dump_profile
+
+
+def set_profiler_hook(hook: Optional[Callable[[Span, Any], None]], sample_rate: Optional[float] = None) -> None:
+    """Replace what happens with a sampled request's cProfile.Profile
+    (default: dump a .prof file under HOMESHIELD_PROFILE_DIR)."""
+    global _profile_hook, _profile_rate
+    _profile_hook = hook or _dump_profile
+    if sample_rate is not None:
+        _profile_rate = float(sample_rate)
+
+
+# ------------------------------------------------------------------- export --
+
+def _finish(s: Span) -> None:
+    record = s.to_dict()
+    with _lock:
+        m = _metrics.get(s.name)
+        if m is None:
+            m = _metrics[s.name] = _StageMetrics()
+        secs = s.duration_ms / 1000.0
+        m.count += 1
+        m.seconds += secs
+        m.errors += 1 if s.error else 0
+        for i, le in enumerate(BUCKETS):
+            if secs <= le:
+                m.buckets[i] += 1
+        if s.parent is None or s.name.startswith(("llm.", "embed")):
+            # own tokens only for leaf LLM stages, totals for requests
+            m.prompt_tokens += s.prompt_tokens
+            m.completion_tokens += s.completion_tokens
+        _recent.append(record)
+        if _jsonl_path:
+            with open(_jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+def enable(jsonl_path: Optional[str] = None) -> None:
+    global _enabled, _jsonl_path
+    if _enabled is None:
+        _load_settings()  # keep HOMESHIELD_TRACE_FILE etc. from the environment
+    _enabled = True
+    if jsonl_path is not None:
+        _jsonl_path = jsonl_path
+
+
+def disable() -> None:
+    global _enabled
+    if _enabled is None:
+        _load_settings()
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled if _enabled is not None else _load_settings()
+
+
+def reset() -> None:
+    with _lock:
+        _metrics.clear()
+        _recent.clear()
+
+
+def recent_spans(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    with _lock:
+        items = list(_recent)
+    return items[-limit:] if limit else items
+
+
+def export_jsonl(path: str) -> int:
+    """Write the buffered spans to `path`; returns how many were written."""
+    items = recent_spans()
+    with open(path, "w", encoding="utf-8") as f:
+        for r in items:
+            f.write(json.dumps(r, default=str) + "\n")
+    return len(items)
+
+
+def _label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(prefix: str = "homeshield") -> str:
+    """Prometheus text exposition of per-stage latency and token counters."""
+    with _lock:
+        snapshot = {k: (m.count, m.errors, m.seconds, list(m.buckets), m.prompt_tokens, m.completion_tokens)
+                    for k, m in _metrics.items()}
+
+    lines = [
+        f"# HELP {prefix}_stage_seconds Wall time per service stage.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for name, (count, _, secs, buckets, _, _) in sorted(snapshot.items()):
+        lbl = f'stage="{_label(name)}"'
+        for le, n in zip(BUCKETS, buckets):
+            lines.append(f'{prefix}_stage_seconds_bucket{{{lbl},le="{le}"}} {n}')
+        lines.append(f'{prefix}_stage_seconds_bucket{{{lbl},le="+Inf"}} {count}')
+        lines.append(f"{prefix}_stage_seconds_sum{{{lbl}}} {secs:.6f}")
+        lines.append(f"{prefix}_stage_seconds_count{{{lbl}}} {count}")
+
+    lines += [
+        f"# HELP {prefix}_stage_errors_total Stages that raised.",
+        f"# TYPE {prefix}_stage_errors_total counter",
+    ]
+    for name, (_, errors, *_rest) in sorted(snapshot.items()):
+        lines.append(f'{prefix}_stage_errors_total{{stage="{_label(name)}"}} {errors}')
+
+    lines += [
+        f"# HELP {prefix}_tokens_total LLM tokens by stage and kind.",
+        f"# TYPE {prefix}_tokens_total counter",
+    ]
+    for name, (*_rest, prompt, completion) in sorted(snapshot.items()):
+        if prompt or completion:
+            lbl = _label(name)
+            lines.append(f'{prefix}_tokens_total{{stage="{lbl}",kind="prompt"}} {prompt}')
+            lines.append(f'{prefix}_tokens_total{{stage="{lbl}",kind="completion"}} {completion}')
+    return "\n".join(lines) + "\n"
@@ -1,26 +1,43 @@
-from langchain_openai import AzureOpenAIEmbeddings, AzureChatOpenAI
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
+# app/vectorstore.py
+# Client factories. The langchain/pinecone stacks are imported inside each
+# factory so that importing this module (and everything that imports
+# chat_client from it) stays cheap until a client is actually needed.
+# Chat and embedding clients share their deployment's quota through
+# app.scheduler; use scheduler.priority() to mark non-interactive work.
 import os
 
 def embeddings():
-    return AzureOpenAIEmbeddings(
+    from langchain_openai import AzureOpenAIEmbeddings
+    from .scheduler import ScheduledEmbeddings, get_scheduler
+    return ScheduledEmbeddings(AzureOpenAIEmbeddings(
         api_key=os.environ["AZURE_OPENAI_API_KEY"],
         api_version=os.environ["AZURE_OPENAI_API_VERSION"],
         azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
         azure_deployment=os.environ["AZURE_OPENAI_EMBEDDING_DEPLOYMENT"],
-    )
+    ), get_scheduler("embed"))
+
+# ingestion.py refers to the embeddings factory by this name
+embeddings_client = embeddings
 
 def chat_client(temperature=0):
-    return AzureChatOpenAI(
+    from langchain_openai import AzureChatOpenAI
+    from .scheduler import ScheduledChat, get_scheduler
+    return ScheduledChat(AzureChatOpenAI(
         api_key=os.environ["AZURE_OPENAI_API_KEY"],
         api_version=os.environ["AZURE_OPENAI_API_VERSION"],
         azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
         azure_deployment=os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"],
         temperature=temperature,
-    )
+    ), get_scheduler("chat"), max_output=int(os.getenv("HOMESHIELD_CHAT_MAX_OUTPUT", "512")))
+
+def pinecone_index():
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+    return pc.Index(os.environ["PINECONE_INDEX"])
 
 def vectorstore(namespace: str = "policies"):
+    from langchain_pinecone import PineconeVectorStore
+    from pinecone import Pinecone
     _ = Pinecone(api_key=os.environ["PINECONE_API_KEY"])  # init
     return PineconeVectorStore(
         index_name=os.environ["PINECONE_INDEX"],
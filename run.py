@@ -0,0 +1,5 @@
+# run.py
+from app.api.main import serve
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,83 @@
+# scripts/bench_adaptive.py
+"""
+Fixed k=8 MMR retrieval vs adaptive depth (retrieve_scored_chunks), with
+and without the first-pass search.
+
+The policies are chunked like ingestion and embedded with a local hashing
+bag-of-words model into an in-memory index (bench_fixtures.py), so the score
+distributions are real even though the embedding model is not. Each index query sleeps --search-ms (plus
+a per-KiB cost for returned vectors) to stand in for Pinecone. Questions are
+the sample coverage questions and evaluation pairs. Run from the repo root:
+
+    python scripts/bench_adaptive.py --search-ms 40
+
+Thresholds default to the shipped ones (rag.MIN_SCORE etc.). Scores from a
+hashing model sit lower than a real embedding deployment's, so at the shipped
+min_score most coverage questions keep only the MIN_K best chunks here;
+--min-score 0.2 is closer to what a real model's scores would give. Pass --min-score/--min-k/
+--gap/--margin to see how the thresholds move the result.
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from app.services import rag  # noqa: E402
+from bench_fixtures import LocalEmbeddings, LocalIndex, policy_chunks, sample_questions  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--search-ms", type=float, default=40.0, help="simulated index round trip")
+    ap.add_argument("--ms-per-kib", type=float, default=0.08, help="simulated transfer cost")
+    ap.add_argument("--min-score", type=float, default=rag.MIN_SCORE)
+    ap.add_argument("--min-k", type=int, default=rag.MIN_K)
+    ap.add_argument("--gap", type=float, default=rag.SCORE_GAP)
+    ap.add_argument("--margin", type=float, default=rag.CLEAR_MARGIN)
+    args = ap.parse_args()
+
+    chunks = policy_chunks()
+    index = LocalIndex(chunks, args.search_ms, args.ms_per_kib)
+    rag.pinecone_index = lambda: index
+    rag.embeddings = lambda: LocalEmbeddings()
+    rag.MIN_SCORE, rag.MIN_K = args.min_score, args.min_k
+    rag.SCORE_GAP, rag.CLEAR_MARGIN = args.gap, args.margin
+    questions = sample_questions()
+
+    print(f"{len(chunks)} chunks, {len(questions)} questions, k={args.k}, fetch_k={rag.FETCH_K}, "
+          f"search {args.search_ms:.0f} ms, min_score={args.min_score} min_k={args.min_k} gap={args.gap} margin={args.margin}\n")
+    print(f"{'set':<12}{'mode':<10}{'chunks':>8}{'~tokens':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'searches':>10}{'1st pass':>10}")
+    for label in ("coverage", "evaluation"):
+        qs = [q for q in questions if q[0] == label]
+        for mode in ("fixed", "adaptive", "+1st pass"):
+            counts, tokens, lat = [], [], []
+            before, first_pass = index.queries, 0
+            for _, question, plan, state, year in qs:
+                t = time.perf_counter()
+                if mode == "fixed":
+                    docs = rag._retrieve_chunks(question, plan, state, year, args.k, None)
+                else:
+                    n_before = index.queries
+                    pairs = rag._retrieve_scored(question, plan, state, year, args.k, None, mode != "adaptive")
+                    docs = [d for d, _ in pairs]
+                    first_pass += index.queries - n_before == 1
+                lat.append((time.perf_counter() - t) * 1000)
+                counts.append(len(docs))
+                tokens.append(sum(len(d.page_content) for d in docs) / 4)
+            lat.sort()
+            print(f"{label:<12}{mode:<10}{statistics.mean(counts):>8.2f}{statistics.mean(tokens):>9.0f}"
+                  f"{lat[len(lat) // 2]:>9.1f}{lat[int(len(lat) * 0.95)]:>9.1f}"
+                  f"{(index.queries - before) / len(qs):>10.2f}"
+                  f"{(f'{first_pass / len(qs):.0%}' if mode == '+1st pass' else '-'):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# scripts/bench_chunkstore.py
+"""
+Bytes per query and retrieval overhead: chunk text in Pinecone metadata vs
+ids-only metadata plus the local chunk store.
+
+The policies are chunked exactly like ingestion. Each simulated query is a
+Pinecone JSON response with fetch_k=24 matches from one policy, with or
+without the text in metadata. We report response size, client-side decode
+time, the transfer time at --mbps, and the cost of fetching the final k
+texts from a temporary SQLite chunk store (cold and cached). Run from the
+repo root:
+
+    python scripts/bench_chunkstore.py --queries 500 --dims 1536
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from app.chunkstore import ChunkStore  # noqa: E402
+from app.services.ingestion import INDEX_METADATA  # noqa: E402
+from bench_fixtures import policy_chunks  # noqa: E402
+
+
+def _response(matches, dims, rng, with_text):
+    body = {"namespace": "policies", "matches": []}
+    for m, text in matches:
+        meta = {**m, "text": text} if with_text else {k: m[k] for k in INDEX_METADATA if k in m}
+        body["matches"].append({
+            "id": m["chunk_id"], "score": round(rng.random(), 6),
+            "values": [round(rng.uniform(-0.1, 0.1), 8) for _ in range(dims)],
+            "metadata": meta,
+        })
+    return json.dumps(body)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--fetch-k", type=int, default=24)
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--dims", type=int, default=1536)
+    ap.add_argument("--mbps", type=float, default=100.0, help="link speed for transfer estimate")
+    args = ap.parse_args()
+    rng = random.Random(11)
+
+    chunks = policy_chunks()
+    by_policy = {}
+    for m, text in chunks:
+        by_policy.setdefault(m["policy_file"], []).append((m, text))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChunkStore(Path(tmp) / "chunks.sqlite3")
+        store.put_many((m["chunk_id"], text, m["source"]) for m, text in chunks)
+
+        rows = {"text in metadata": [], "ids + chunk store": []}
+        for _ in range(args.queries):
+            pool = by_policy[rng.choice(list(by_policy))]
+            # filters narrow to one state/plan/year; pad from neighbours like a real top_k would
+            matches = (pool * ((args.fetch_k // len(pool)) + 1))[:args.fetch_k]
+            final_ids = [m["chunk_id"] for m, _ in matches[:args.k]]
+            for label, with_text in (("text in metadata", True), ("ids + chunk store", False)):
+                payload = _response(matches, args.dims, rng, with_text)
+                t = time.perf_counter()
+                json.loads(payload)
+                decode = time.perf_counter() - t
+                fetch = 0.0
+                if not with_text:
+                    t = time.perf_counter()
+                    store.get_many(final_ids)
+                    fetch = time.perf_counter() - t
+                rows[label].append((len(payload), decode, fetch))
+
+        print(f"{len(chunks)} chunks, {args.queries} queries, fetch_k={args.fetch_k}, k={args.k}, "
+              f"{args.dims}-dim values, store cache hit rate "
+              f"{store.hits / max(1, store.hits + store.misses):.0%}\n")
+        print(f"{'layout':<20}{'KiB/query':>10}{'text KiB':>10}{'decode ms':>11}{'store ms':>10}"
+              f"{'xfer ms @' + str(int(args.mbps)) + 'Mb':>16}")
+        for label, vals in rows.items():
+            size = statistics.mean(v[0] for v in vals)
+            text_kib = (size - statistics.mean(v[0] for v in rows["ids + chunk store"])) / 1024
+            xfer = size * 8 / (args.mbps * 1e6) * 1000
+            print(f"{label:<20}{size / 1024:>10.1f}{max(0.0, text_kib):>10.1f}"
+                  f"{statistics.mean(v[1] for v in vals) * 1000:>11.3f}"
+                  f"{statistics.mean(v[2] for v in vals) * 1000:>10.3f}{xfer:>16.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
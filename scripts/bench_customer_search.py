@@ -0,0 +1,150 @@
+# scripts/bench_customer_search.py
+"""
+Customer search index: build time, memory and query latency.
+
+Sizes are the sample customers.csv (2k rows) and synthetic customer sets
+with a realistic name distribution (a few hundred first names, tens of
+thousands of surnames). Queries mix ID prefixes, email prefixes, surname
+prefixes, full names and misspelled names drawn from the data. For scale,
+the 2k row also times today's get_customer (full pandas scan, exact ID
+only). Run from the repo root:
+
+    python scripts/bench_customer_search.py --sizes 2000,5000000
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.services.customer_search import CustomerIndex  # noqa: E402
+
+SAMPLE = ROOT / "homeshield_sample_data" / "customers.csv"
+_SYL = ["an", "ar", "be", "bra", "ca", "da", "del", "el", "fa", "ga", "gar", "ha", "in", "jo", "ka", "la",
+        "le", "li", "lo", "ma", "mar", "mi", "mo", "na", "ne", "ni", "no", "pa", "ra", "ri", "ro", "sa",
+        "se", "si", "son", "ta", "te", "ti", "to", "va", "ve", "vi", "wa", "ya", "za", "ton", "ley", "man"]
+
+
+def _names(rng, n, parts):
+    out = set()
+    while len(out) < n:
+        out.add("".join(rng.choice(_SYL) for _ in range(rng.choice(parts))).title())
+    return sorted(out)
+
+
+def synthetic_rows(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    firsts = _names(rng, 400, (2, 3))
+    lasts = _names(rng, 40_000, (2, 3, 4))
+    # Zipf-ish surname popularity, like real populations
+    weights = [1.0 / (i + 10) for i in range(len(lasts))]
+    last_pick = rng.choices(range(len(lasts)), weights=weights, k=n)
+    for i in range(n):
+        f, l = rng.choice(firsts), lasts[last_pick[i]]
+        yield {
+            "customer_id": f"C{i + 1:07d}",
+            "first_name": f,
+            "last_name": l,
+            "email": f"{f.lower()}.{l.lower()}{i % 997}@example.com",
+        }
+
+
+def _queries(index: CustomerIndex, n: int, seed: int = 9):
+    rng = random.Random(seed)
+    qs = []
+    for _ in range(n):
+        row = rng.randrange(len(index))
+        cid, email = index.ids[row], index.emails[row]
+        first, last = index.names[index.first[row]], index.names[index.last[row]]
+        kind = rng.choice(["id prefix", "email prefix", "surname prefix", "full name", "typo"])
+        if kind == "id prefix":
+            q = cid[:rng.randint(3, len(cid))]
+        elif kind == "email prefix":
+            q = email[:rng.randint(3, 10)]
+        elif kind == "surname prefix":
+            q = last[:rng.randint(3, max(3, len(last)))]
+        elif kind == "full name":
+            q = f"{first} {last[:rng.randint(2, len(last))]}"
+        else:
+            i = rng.randrange(1, len(last))
+            q = last[:i] + last[i + 1:] if len(last) > 4 else last
+        qs.append((kind, q))
+    return qs
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("nan")
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def run(label: str, rows, queries: int, k: int) -> CustomerIndex:
+    gc.collect()
+    rss0 = _rss_mb()
+    t = time.perf_counter()
+    index = rows() if callable(rows) else CustomerIndex(rows)
+    build = time.perf_counter() - t
+    gc.collect()
+    print(f"\n{label}: {len(index):,} customers, {len(index.names):,} distinct names, build {build:.2f}s, "
+          f"index {index.nbytes() / 2**20:.1f} MiB ({index.nbytes() / len(index):.0f} B/customer), "
+          f"RSS +{_rss_mb() - rss0:.0f} MiB")
+    by_kind = {}
+    for kind, q in _queries(index, queries):
+        t = time.perf_counter()
+        index.search(q, k)
+        by_kind.setdefault(kind, []).append((time.perf_counter() - t) * 1e6)
+    print(f"  {'query':<16}{'p50 us':>9}{'p99 us':>9}{'max us':>9}")
+    for kind, xs in by_kind.items():
+        print(f"  {kind:<16}{pct(xs, 50):>9.0f}{pct(xs, 99):>9.0f}{max(xs):>9.0f}")
+    allq = [x for xs in by_kind.values() for x in xs]
+    print(f"  {'all':<16}{pct(allq, 50):>9.0f}{pct(allq, 99):>9.0f}{max(allq):>9.0f}")
+    return index
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", default="2000,5000000", help="2000 = the sample CSV; others are synthetic")
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--k", type=int, default=8)
+    args = ap.parse_args()
+
+    for n in (int(x) for x in args.sizes.split(",")):
+        if n == 2000:
+            run("sample customers.csv", lambda: CustomerIndex.from_csv(str(SAMPLE)), args.queries, args.k)
+            os.environ.setdefault("CUSTOMERS_CSV", str(SAMPLE))
+            from app.services.customers import get_customer
+            try:
+                import pandas  # noqa: F401
+            except ImportError:
+                print("  (pandas not installed; skipping the get_customer baseline)")
+                continue
+            xs = []
+            for i in range(50):
+                t = time.perf_counter()
+                get_customer(f"C{i * 37 % 2000 + 1:05d}")
+                xs.append((time.perf_counter() - t) * 1e6)
+            print(f"  {'get_customer':<16}{pct(xs, 50):>9.0f}{pct(xs, 99):>9.0f}{max(xs):>9.0f}   (exact ID, pandas scan)")
+        else:
+            run(f"synthetic {n:,}", synthetic_rows(n), args.queries, args.k)
+            gc.collect()
+
+
+if __name__ == "__main__":
+    main()
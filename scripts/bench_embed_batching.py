@@ -0,0 +1,104 @@
+# scripts/bench_embed_batching.py
+"""
+Embedding micro-batching under concurrent load, against a local stub.
+
+The stub embed_documents call costs --base-ms plus --per-item-ms per text.
+At each concurrency level, every client thread embeds --queries distinct
+texts one at a time, first with a direct call per query and then through
+EmbeddingDispatcher. The report shows upstream calls, calls saved and the
+latency the batching window adds (or removes). Run from the repo root:
+
+    python scripts/bench_embed_batching.py --levels 1,4,16,64 --window-ms 5
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.batching import EmbeddingDispatcher  # noqa: E402
+
+
+class StubEmbeddings:
+    def __init__(self, base: float, per_item: float) -> None:
+        self.base, self.per_item = base, per_item
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.base + self.per_item * len(texts))
+        return [[float(len(t))] * 8 for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _drive(concurrency: int, queries: int, embed) -> list:
+    lat, lock = [], threading.Lock()
+    barrier = threading.Barrier(concurrency)
+
+    def client(cid: int):
+        mine = []
+        barrier.wait()
+        for i in range(queries):
+            t = time.perf_counter()
+            embed(f"client {cid} question {i}")
+            mine.append(time.perf_counter() - t)
+        with lock:
+            lat.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return lat
+
+
+def _p(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q / 100.0 * (len(xs) - 1))))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--levels", default="1,4,16,64")
+    ap.add_argument("--queries", type=int, default=20, help="queries per client")
+    ap.add_argument("--base-ms", type=float, default=30.0)
+    ap.add_argument("--per-item-ms", type=float, default=0.5)
+    ap.add_argument("--window-ms", type=float, default=5.0)
+    ap.add_argument("--max-batch", type=int, default=16)
+    ap.add_argument("--max-inflight", type=int, default=4)
+    args = ap.parse_args()
+
+    print(f"stub: {args.base_ms:.0f} ms + {args.per_item_ms} ms/text; window {args.window_ms} ms, "
+          f"max batch {args.max_batch}, max in-flight {args.max_inflight}\n")
+    print(f"{'clients':>7}{'direct calls':>14}{'batched calls':>15}{'saved':>8}{'avg batch':>11}"
+          f"{'direct p50/p99 ms':>20}{'batched p50/p99 ms':>21}{'added p50 ms':>14}")
+    for level in (int(x) for x in args.levels.split(",")):
+        direct = StubEmbeddings(args.base_ms / 1000, args.per_item_ms / 1000)
+        d_lat = _drive(level, args.queries, direct.embed_query)
+
+        batched = StubEmbeddings(args.base_ms / 1000, args.per_item_ms / 1000)
+        disp = EmbeddingDispatcher(batched.embed_documents, max_batch=args.max_batch,
+                                   window_ms=args.window_ms, max_inflight=args.max_inflight)
+        b_lat = _drive(level, args.queries, disp.embed_query)
+        st = disp.stats()
+        disp.close()
+
+        ms = lambda xs: [x * 1000 for x in xs]  # noqa: E731
+        d, b = ms(d_lat), ms(b_lat)
+        saved = 1 - batched.calls / direct.calls
+        print(f"{level:>7}{direct.calls:>14}{batched.calls:>15}{saved:>8.0%}{st['avg_batch']:>11.1f}"
+              f"{_p(d, 50):>11.1f}/{_p(d, 99):<8.1f}{_p(b, 50):>12.1f}/{_p(b, 99):<8.1f}"
+              f"{statistics.median(b) - statistics.median(d):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# scripts/bench_fixtures.py
+"""
+Shared fixtures for the bench_* scripts (not a benchmark itself).
+
+policy_chunks() splits the policies with ingestion's text_splitter() and
+numbers them the way load_and_chunk does. LocalEmbeddings is a hashing
+bag-of-words model and LocalIndex an in-memory index that understands the
+$and/$eq/$in filters retrieve_chunks sends; each query sleeps to stand in for
+Pinecone. sample_questions() reads the sample coverage questions and
+evaluation pairs.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.services.ingestion import _parse_meta_from_filename, text_splitter  # noqa: E402
+
+DATA = ROOT / "homeshield_sample_data"
+DIMS = 512
+_WORD = re.compile(r"[a-z0-9$]+")
+
+
+def policy_chunks(policy_dir: Path = ROOT / "policies_docs"):
+    """[(metadata, text), ...] for every policy, as ingestion chunks them."""
+    splitter = text_splitter()
+    out, i = [], 0
+    for p in Path(policy_dir).glob("*.txt"):
+        text = p.read_text(encoding="utf-8")
+        meta = {"source": str(p), **_parse_meta_from_filename(str(p))}
+        for d in splitter.create_documents([text], metadatas=[meta]):
+            m = dict(d.metadata)
+            m.setdefault("page", (i // 5) + 1)
+            m.setdefault("section", "policy")
+            m["chunk_id"] = f"{p.name}-{i:04d}"
+            out.append((m, d.page_content))
+            i += 1
+    return out
+
+
+def embed(text: str):
+    v = np.zeros(DIMS, dtype=np.float32)
+    words = _WORD.findall(text.lower())
+    for tok in words + [a + " " + b for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+        v[h % DIMS] += 1.0 if (h >> 63) else -1.0
+    n = np.linalg.norm(v)
+    return (v / n) if n else v
+
+
+def _matches(flt, meta) -> bool:
+    for clause in flt.get("$and", [flt]):
+        for field, cond in clause.items():
+            if "$eq" in cond and meta.get(field) != cond["$eq"]:
+                return False
+            if "$in" in cond and meta.get(field) not in cond["$in"]:
+                return False
+    return True
+
+
+class LocalIndex:
+    def __init__(self, chunks, search_ms: float, ms_per_kib: float) -> None:
+        self.meta = [{**m, "text": t} for m, t in chunks]  # legacy text-in-metadata path
+        self.vecs = np.stack([embed(t) for _, t in chunks])
+        self.search = search_ms / 1000.0
+        self.per_kib = ms_per_kib / 1000.0
+        self.queries = 0
+
+    def query(self, vector, top_k, filter=None, include_values=False, **kwargs):
+        self.queries += 1
+        idx = [i for i, m in enumerate(self.meta) if _matches(filter or {}, m)]
+        scores = self.vecs[idx] @ np.asarray(vector, dtype=np.float32)
+        order = np.argsort(-scores)[:top_k]
+        out = []
+        for j in order:
+            i = idx[j]
+            out.append(SimpleNamespace(
+                id=self.meta[i]["chunk_id"], score=float(scores[j]), metadata=dict(self.meta[i]),
+                values=self.vecs[i].tolist() if include_values else None,
+            ))
+        # ~1536 float32 as JSON is ~12 KiB per vector on the wire
+        kib = len(out) * 12 if include_values else len(out) * 0.3
+        time.sleep(self.search + kib * self.per_kib)
+        return SimpleNamespace(matches=out)
+
+
+class LocalEmbeddings:
+    def embed_query(self, text):
+        return embed(text).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def sample_questions():
+    """[(set, question, plan, state, year), ...]; set is 'coverage' or 'evaluation'."""
+    rows = []
+    with open(DATA / "coverage_questions.jsonl", encoding="utf-8") as f:
+        for line in f:
+            q = json.loads(line)
+            rows.append(("coverage", q["question"], q["plan"], q["state"], int(q["year"])))
+    with open(DATA / "evaluation_pairs.jsonl", encoding="utf-8") as f:
+        for line in f:
+            q = json.loads(line)
+            m = q["metadata"]
+            rows.append(("evaluation", q["question"], m["plan"], m["state"], int(m["year"])))
+    return rows
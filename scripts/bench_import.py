@@ -0,0 +1,110 @@
+# scripts/bench_import.py
+"""
+Cold-start benchmark for the app entry points.
+
+Each entry point is imported in a fresh interpreter with ``-X importtime``;
+we report the cumulative import time, the peak resident memory of the child
+process and the slowest top-level imports. Run from the repo root:
+
+    python scripts/bench_import.py
+    python scripts/bench_import.py --runs 7 --top 10 --entry ui
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules each entry point imports before it does any work.
+ENTRY_POINTS: Dict[str, List[str]] = {
+    # streamlit_app.py, minus streamlit itself (which is the same for any UI)
+    "ui": ["app.services.customers", "app.services.customer_search", "app.services.policy_cache",
+           "app.services.rag", "app.services.claims", "app.vectorstore"],
+    "ingestion": ["app.services.ingestion"],
+    "batch": ["app.services.claims", "app.services.coverage", "app.services.upgrades"],
+}
+
+_CHILD = (
+    "import resource, sys\n"
+    "{imports}\n"
+    "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    "print(rss * (1 if sys.platform == 'darwin' else 1024))\n"
+)
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for top-level imports only."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cum_us, name = line.split(":", 1)[1].split("|")
+        # nesting is encoded as two extra spaces per level after the bar
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 0:
+            rows.append((name.strip(), int(self_us), int(cum_us)))
+    return rows
+
+def run_once(modules: List[str]) -> Dict:
+    code = _CHILD.format(imports="\n".join(f"import {m}" for m in modules))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"ok": False, "error": last}
+    rows = _parse_importtime(proc.stderr)
+    return {
+        "ok": True,
+        "import_ms": sum(r[2] for r in rows) / 1000.0,
+        "rss_mb": int(proc.stdout.strip().splitlines()[-1]) / (1024 * 1024),
+        "top": sorted(rows, key=lambda r: r[2], reverse=True),
+    }
+
+def bench(name: str, runs: int, top: int) -> Dict:
+    results = [run_once(ENTRY_POINTS[name]) for _ in range(runs)]
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        return {"entry": name, "ok": False, "error": failed[0]["error"]}
+    return {
+        "entry": name,
+        "ok": True,
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in results), 2),
+        "import_ms_min": round(min(r["import_ms"] for r in results), 2),
+        "rss_mb_median": round(statistics.median(r["rss_mb"] for r in results), 1),
+        "slowest": [
+            {"module": m, "cumulative_ms": round(c / 1000.0, 2)}
+            for m, _, c in results[-1]["top"][:top]
+        ],
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--entry", choices=sorted(ENTRY_POINTS), action="append",
+                    help="entry point(s) to measure (default: all)")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    args = ap.parse_args()
+
+    for name in args.entry or list(ENTRY_POINTS):
+        res = bench(name, args.runs, args.top)
+        if args.json:
+            print(json.dumps(res))
+            continue
+        if not res["ok"]:
+            print(f"{name:<10} import failed: {res['error']}")
+            continue
+        print(f"{name:<10} import {res['import_ms_median']:>8.2f} ms (min {res['import_ms_min']:.2f})"
+              f"   rss {res['rss_mb_median']:>6.1f} MB")
+        for row in res["slowest"]:
+            print(f"{'':<10}   {row['cumulative_ms']:>8.2f} ms  {row['module']}")
+
+if __name__ == "__main__":
+    main()
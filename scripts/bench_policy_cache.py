@@ -0,0 +1,95 @@
+# scripts/bench_policy_cache.py
+"""
+Per-turn retrieval latency: remote filtered index query vs the customer's
+pinned policy ranked locally (app.services.policy_cache).
+
+Uses the local hashing embedder and in-memory index from bench_fixtures.py; the index sleeps --search-ms per query (plus transfer for
+returned vectors) and every embedding call sleeps --embed-ms, so the remote
+numbers stand in for Pinecone and Azure. The remote path is what the chat
+did before: retrieve_chunks with the customer's policy_source. Questions are
+the sample coverage questions and evaluation pairs, each asked by a customer
+holding that plan/state/year. Run from the repo root:
+
+    python scripts/bench_policy_cache.py --search-ms 40 --embed-ms 25
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from app.services import policy_cache, rag  # noqa: E402
+from bench_fixtures import LocalEmbeddings, LocalIndex, policy_chunks, sample_questions  # noqa: E402
+
+
+class _SlowEmbeddings(LocalEmbeddings):
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [super(_SlowEmbeddings, self).embed_query(t) for t in texts]
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--search-ms", type=float, default=40.0, help="simulated index round trip")
+    ap.add_argument("--ms-per-kib", type=float, default=0.08, help="simulated transfer cost")
+    ap.add_argument("--embed-ms", type=float, default=25.0, help="simulated embedding call")
+    args = ap.parse_args()
+
+    chunks = [({**m, "source": Path(m["source"]).name}, text) for m, text in policy_chunks()]
+    index = LocalIndex(chunks, args.search_ms, args.ms_per_kib)
+    emb = _SlowEmbeddings(args.embed_ms / 1000.0)
+    rag.pinecone_index = lambda: index
+    rag.embeddings = lambda: emb
+    questions = sample_questions()
+
+    pin_new, pin_hit, remote, local, overlap, rerouted = [], [], [], [], [], 0
+    for _, question, plan, state, year in questions:
+        policy_file = f"LHG_{plan}_{state}_{year}.txt"
+        seen = any(key[0].endswith(policy_file) for key in policy_cache._cache)
+        t = time.perf_counter()
+        pinned = policy_cache.pin_policy(policy_file, plan, state, year)
+        (pin_hit if seen else pin_new).append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        a = rag._retrieve_chunks(question, plan, state, year, args.k, policy_file)
+        remote.append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        b = pinned.retrieve(question, k=args.k)
+        local.append((time.perf_counter() - t) * 1000)
+        rerouted += pinned.remote_plan(question) is not None
+
+        sa, sb = {d.page_content for d in a}, {d.page_content for d in b}
+        overlap.append(len(sa & sb) / max(1, len(sa)))
+
+    print(f"{len(questions)} turns, {len(pin_new)} policy pins (LRU of 64), k={args.k}, search {args.search_ms:.0f} ms, "
+          f"embed {args.embed_ms:.0f} ms\n")
+    print(f"{'path':<22}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}")
+    for label, xs in (("remote index", remote), ("pinned, local rank", local)):
+        print(f"{label:<22}{pct(xs, 50):>9.1f}{pct(xs, 95):>9.1f}{statistics.mean(xs):>9.1f}")
+    print(f"\npin (chunk + embed) once per policy: mean {statistics.mean(pin_new):.1f} ms, "
+          f"later lookups {pct(pin_hit, 50):.3f} ms")
+    print(f"same chunks as remote: {statistics.mean(overlap):.0%}   routed to remote as cross-plan: "
+          f"{rerouted / len(questions):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# scripts/bench_scheduler.py
+"""
+Interactive LLM latency with and without a concurrent batch job, calling a
+shared deployment directly vs through app.scheduler.
+
+The deployment is a local stub with a tokens-per-minute limit: calls over
+budget fail with a rate-limit error and the client retries after the
+reported delay, like the OpenAI SDK does on a 429. --users interactive
+callers each send a chat turn and think for --think-ms; the batch job runs
+--batch-threads callers back to back. With the scheduler, batch work runs
+in the "batch" class against a budget just under the stub's. Run from the
+repo root:
+
+    python scripts/bench_scheduler.py --duration 15 --tpm 600000
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app import scheduler  # noqa: E402
+from app.scheduler import ScheduledChat, Scheduler, TokenBucket  # noqa: E402
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"429, retry after {retry_after:.3f}s")
+        self.retry_after = retry_after
+
+
+class _StubDeployment:
+    def __init__(self, tpm: float, latency: float, burst_s: float) -> None:
+        self.bucket = TokenBucket(tpm, burst_s)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def invoke(self, messages, output_tokens: int = 150):
+        prompt = sum(len(m["content"]) for m in messages) // 4
+        with self.lock:
+            wait = self.bucket.wait_for(prompt + output_tokens)
+            if wait > 0:
+                self.rejected += 1
+                raise RateLimited(wait)
+            self.bucket.take(prompt + output_tokens)
+        time.sleep(self.latency + output_tokens * 0.0002)
+        return SimpleNamespace(content="ok", usage_metadata={"input_tokens": prompt, "output_tokens": output_tokens})
+
+
+class _RetryingClient:
+    """What the SDK does on a 429: sleep the hinted delay and try again."""
+
+    def __init__(self, deployment: _StubDeployment, max_retries: int = 8) -> None:
+        self.deployment = deployment
+        self.max_retries = max_retries
+        self.retries = 0
+
+    def invoke(self, messages, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.deployment.invoke(messages, **kwargs)
+            except RateLimited as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                time.sleep(max(e.retry_after, 0.05) * (1 + random.random() * 0.2))
+
+
+def _prompt(tokens: int):
+    return [{"role": "system", "content": "x" * 400}, {"role": "user", "content": "y" * (tokens * 4 - 400)}]
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def run(args, with_batch: bool, scheduled: bool):
+    deployment = _StubDeployment(args.tpm, args.latency_ms / 1000.0, args.burst_s)
+    raw = _RetryingClient(deployment)
+    if scheduled:
+        sched = Scheduler("chat", tpm=args.tpm * 0.95, burst_s=args.burst_s)
+        llm = ScheduledChat(raw, sched, max_output=150)
+    else:
+        sched, llm = None, raw
+    stop_at = time.perf_counter() + args.duration
+    lat, errors, batch_done = [], [0], [0]
+    lock = threading.Lock()
+
+    def user(seed):
+        rng = random.Random(seed)
+        time.sleep(rng.random() * args.think_ms / 1000.0)
+        while time.perf_counter() < stop_at:
+            t = time.perf_counter()
+            try:
+                llm.invoke(_prompt(args.interactive_tokens))
+                with lock:
+                    lat.append((time.perf_counter() - t) * 1000)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+            time.sleep(rng.expovariate(1000.0 / args.think_ms))
+
+    def batch_worker():
+        with scheduler.priority("batch"):
+            while time.perf_counter() < stop_at:
+                try:
+                    llm.invoke(_prompt(args.batch_tokens))
+                    with lock:
+                        batch_done[0] += 1
+                except Exception:
+                    pass
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+    if with_batch:
+        threads += [threading.Thread(target=batch_worker) for _ in range(args.batch_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return lat, errors[0], batch_done[0] / args.duration, raw.retries
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--tpm", type=float, default=600_000, help="stub deployment quota")
+    ap.add_argument("--burst-s", type=float, default=1.0, help="seconds of quota the stub lets through at once")
+    ap.add_argument("--latency-ms", type=float, default=150.0)
+    ap.add_argument("--users", type=int, default=3)
+    ap.add_argument("--think-ms", type=float, default=1000.0)
+    ap.add_argument("--interactive-tokens", type=int, default=1500)
+    ap.add_argument("--batch-threads", type=int, default=8)
+    ap.add_argument("--batch-tokens", type=int, default=2000)
+    args = ap.parse_args()
+
+    print(f"stub quota {args.tpm:,.0f} TPM, {args.users} users ({args.interactive_tokens} tok, "
+          f"think {args.think_ms:.0f} ms), batch {args.batch_threads} threads ({args.batch_tokens} tok)\n")
+    print(f"{'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'turns':>7}{'errors':>8}"
+          f"{'429s':>7}{'batch/s':>9}")
+    for label, with_batch, scheduled in (
+        ("interactive only, direct", False, False),
+        ("interactive only, sched", False, True),
+        ("+ batch job, direct", True, False),
+        ("+ batch job, sched", True, True),
+    ):
+        lat, errors, batch_rate, retries = run(args, with_batch, scheduled)
+        print(f"{label:<28}{pct(lat, 50):>9.0f}{pct(lat, 95):>9.0f}{pct(lat, 99):>9.0f}{len(lat):>7}"
+              f"{errors:>8}{retries:>7}{batch_rate:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
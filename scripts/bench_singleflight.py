@@ -0,0 +1,150 @@
+# scripts/bench_singleflight.py
+"""
+Burst-load check for request coalescing, against local stubs.
+
+A burst of concurrent callers asks a handful of distinct questions. We count
+how many times the (stubbed) embedding, vector search and chat model are hit
+with coalescing on and off, for both threads and asyncio. Run from the repo
+root:
+
+    python scripts/bench_singleflight.py --callers 64 --distinct 4
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import claims, rag  # noqa: E402
+from app.singleflight import SingleFlight  # noqa: E402
+
+
+class PassThrough(SingleFlight):
+    """Baseline: every caller runs its own call."""
+
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+class Counters:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.embed = self.search = self.llm = 0
+
+    def bump(self, name: str) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class StubEmbeddings:
+    def __init__(self, c: Counters, latency: float) -> None:
+        self.c, self.latency = c, latency
+
+    def embed_query(self, text):
+        self.c.bump("embed")
+        time.sleep(self.latency)
+        return [1.0] + [0.0] * 23
+
+
+class StubIndex:
+    def __init__(self, c: Counters, latency: float) -> None:
+        self.c, self.latency = c, latency
+
+    def query(self, vector, top_k, **kwargs):
+        self.c.bump("search")
+        time.sleep(self.latency)
+        return SimpleNamespace(matches=[
+            SimpleNamespace(id=f"hs-{i}", score=1.0, values=[float(i == j) for j in range(top_k)],
+                            metadata={"source": "stub.txt", "page": 1, "text": f"clause {i}"})
+            for i in range(top_k)
+        ])
+
+
+class StubChat:
+    def __init__(self, c: Counters, latency: float) -> None:
+        self.c, self.latency = c, latency
+
+    def invoke(self, messages):
+        self.c.bump("llm")
+        time.sleep(self.latency)
+        return SimpleNamespace(content='{"covered":"yes","reason":"stub","resolved_question":"q"}')
+
+
+def _install(c: Counters, latency: float, coalesce: bool) -> None:
+    rag.embeddings = lambda: StubEmbeddings(c, latency / 2)
+    rag.pinecone_index = lambda: StubIndex(c, latency)
+    claims.chat_client = lambda temperature=0: StubChat(c, latency)
+    flight = SingleFlight if coalesce else PassThrough
+    rag.retrieval_flight = flight("retrieve")
+    rag.embedding_flight = flight("embed")
+    claims.verdict_flight = flight("verdict")
+
+
+def _questions(distinct: int):
+    return [f"Is the water heater covered? #{i}" for i in range(distinct)]
+
+
+def run_threads(callers: int, distinct: int, latency: float, coalesce: bool):
+    c = Counters()
+    _install(c, latency, coalesce)
+    qs = _questions(distinct)
+    barrier = threading.Barrier(callers)
+
+    def one(i):
+        barrier.wait()
+        return claims.evaluate_claim(qs[i % distinct], "Gold", "TX", 2025)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        results = list(pool.map(one, range(callers)))
+    elapsed = time.perf_counter() - t0
+    assert all(r["covered"] for r in results)
+    return c, elapsed
+
+
+def run_async(callers: int, distinct: int, latency: float, coalesce: bool):
+    c = Counters()
+    _install(c, latency, coalesce)
+    qs = _questions(distinct)
+
+    async def main():
+        return await asyncio.gather(*[
+            rag.aretrieve_chunks(qs[i % distinct], "Gold", "TX", 2025) for i in range(callers)
+        ])
+
+    t0 = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - t0
+    assert all(len(r) == 8 for r in results)
+    return c, elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--callers", type=int, default=64)
+    ap.add_argument("--distinct", type=int, default=4)
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="stub upstream latency")
+    args = ap.parse_args()
+    lat = args.latency_ms / 1000.0
+
+    print(f"{args.callers} concurrent callers, {args.distinct} distinct questions, "
+          f"{args.latency_ms:.0f} ms stub latency\n")
+    print(f"{'mode':<26}{'embed':>7}{'search':>8}{'llm':>6}{'wall ms':>10}")
+    for label, runner in (("threads/evaluate_claim", run_threads), ("asyncio/retrieve", run_async)):
+        for coalesce in (False, True):
+            c, elapsed = runner(args.callers, args.distinct, lat, coalesce)
+            tag = f"{label} {'on' if coalesce else 'off'}"
+            print(f"{tag:<26}{c.embed:>7}{c.search:>8}{c.llm:>6}{elapsed * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# scripts/bench_upgrades.py
+"""
+Upgrade-suggestion latency: precomputed plan table vs retrieval + LLM.
+
+Questions come from the sample coverage questions and claims. The retrieval
+and LLM path runs against local stubs with a configurable latency (there is
+no network here), so its numbers are a floor for the real thing. Run from
+the repo root:
+
+    python scripts/bench_upgrades.py --samples 500
+"""
+from __future__ import annotations
+import argparse
+import csv
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.services import claims, plan_diffs, rag, upgrades  # noqa: E402
+
+DATA = ROOT / "homeshield_sample_data"
+
+
+def _questions(n: int, seed: int = 7):
+    rows = []
+    with open(DATA / "coverage_questions.jsonl", encoding="utf-8") as f:
+        for line in f:
+            q = json.loads(line)
+            rows.append((q["question"], q["plan"], q["state"], int(q["year"])))
+    with open(DATA / "claims.csv", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            issue = f"{r['appliance']} {r['issue']}"
+            rows.append((issue, r["plan"], r["state"], 2025))
+    random.Random(seed).shuffle(rows)
+    return rows[:n]
+
+
+class _StubIndex:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def query(self, vector, top_k, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(matches=[SimpleNamespace(
+            id="hs-0", score=1.0, values=[1.0] * 8,
+            metadata={"source": "stub.txt", "page": 1, "text": "stub clause"},
+        )])
+
+
+class _StubChat:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return SimpleNamespace(content='{"covered":"uncertain","reason":"stub"}')
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def _report(label, times, extra=""):
+    ms = [t * 1000 for t in times]
+    print(f"{label:<18}{len(ms):>6}{statistics.mean(ms):>10.3f}{_pct(ms, 50):>10.3f}"
+          f"{_pct(ms, 95):>10.3f}{_pct(ms, 99):>10.3f}  {extra}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--samples", type=int, default=500)
+    ap.add_argument("--baseline-samples", type=int, default=20)
+    ap.add_argument("--retrieve-ms", type=float, default=80.0)
+    ap.add_argument("--llm-ms", type=float, default=400.0)
+    args = ap.parse_args()
+
+    rag.embeddings = lambda: SimpleNamespace(embed_query=lambda q: [1.0] * 8)
+    rag.pinecone_index = lambda: _StubIndex(args.retrieve_ms / 1000)
+    claims.chat_client = lambda temperature=0: _StubChat(args.llm_ms / 1000)
+
+    t0 = time.perf_counter()
+    table = plan_diffs.build_plan_table()
+    build_s = time.perf_counter() - t0
+    size = len(json.dumps(table, separators=(",", ":")))
+    plan_diffs.load_plan_table.cache_clear()
+    plan_diffs.load_plan_table()  # warm, as a long-lived process would be
+
+    qs = _questions(args.samples)
+    print(f"table build {build_s * 1000:.0f} ms, {size / 1024:.0f} KiB, "
+          f"{len(table['plans'])} state/year groups\n")
+    print(f"{'path':<18}{'n':>6}{'mean ms':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+
+    hits, table_times = 0, []
+    for issue, plan, state, year in qs:
+        t = time.perf_counter()
+        cands = plan_diffs.evaluate_from_table(issue, plan, state, year)
+        table_times.append(time.perf_counter() - t)
+        hits += cands is not None
+    _report("table lookup", table_times, f"hit rate {hits / len(qs):.0%}")
+
+    end_to_end = []
+    for issue, plan, state, year in qs[:args.baseline_samples * 5]:
+        t = time.perf_counter()
+        upgrades.suggest_alternative_plans(issue, plan, state, year)
+        end_to_end.append(time.perf_counter() - t)
+    _report("table + fallback", end_to_end, "misses pay the stubbed retrieval + LLM")
+
+    baseline = []
+    for issue, plan, state, year in qs[:args.baseline_samples]:
+        t = time.perf_counter()
+        upgrades._rank_candidates(upgrades._retrieval_candidates(issue, plan, state, year), 3)
+        baseline.append(time.perf_counter() - t)
+    _report("retrieval + LLM", baseline,
+            f"stub latency {args.retrieve_ms:.0f} ms/search, {args.llm_ms:.0f} ms/LLM")
+
+
+if __name__ == "__main__":
+    main()
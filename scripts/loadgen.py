@@ -0,0 +1,147 @@
+# scripts/loadgen.py
+"""
+Load generator for the HTTP API.
+
+By default it starts the API in-process on a free port, with stub services
+that sleep for --service-ms instead of calling Azure/Pinecone, then drives
+it from --concurrency client connections for --duration seconds
+and reports throughput, latency percentiles and status codes. Point --url
+at a running server to load-test that instead.
+
+    python scripts/loadgen.py --concurrency 32 --duration 10
+    python scripts/loadgen.py --endpoint batch --batch-size 16
+    python scripts/loadgen.py --url http://127.0.0.1:8000 --endpoint coverage
+"""
+from __future__ import annotations
+import argparse
+import collections
+import http.client
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SCOPE = {"plan": "Gold", "state": "TX", "effective_year": 2025}
+ENDPOINTS = {
+    "coverage": ("POST", "/coverage/query", {**SCOPE, "question": "Is my water heater covered?"}),
+    "claim": ("POST", "/claims/evaluate", {**SCOPE, "issue_description": "Compressor failed"}),
+    "retrieve": ("POST", "/retrieve", {**SCOPE, "query": "service fee"}),
+    "upgrade": ("POST", "/upgrades/suggest", {**SCOPE, "issue": "labor for water heater"}),
+    "customer": ("GET", "/customers/C00042", None),
+}
+
+
+def stub_services(latency: float):
+    def slow(result):
+        def fn(*args, **kwargs):
+            time.sleep(latency)
+            return result
+        return fn
+
+    return {
+        "check_coverage": slow({"status": "likely_covered", "reason": "stub", "citations": []}),
+        "evaluate_claim": slow({"covered": True, "covered_raw": "yes", "reason": "stub", "citations": []}),
+        "retrieve_chunks": slow([{"source": "stub.txt", "page": 1, "text": "stub"}]),
+        "get_customer": slow({"id": "C00042", "plan": "Gold", "state": "TX",
+                              "effective_year": 2025, "policy_file": "LHG_Gold_TX_2025.txt"}),
+        "suggest_alternative_plans": slow([]),
+    }
+
+
+def start_local(args):
+    import logging
+    from app.api.main import create_app, make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+
+    app = create_app(stub_services(args.service_ms / 1000.0), workers=args.workers,
+                     queue=args.queue, timeout_s=args.timeout)
+    server = make_server(app, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _request_for(args):
+    if args.endpoint == "batch":
+        method, path, payload = ENDPOINTS["coverage"]
+        return "POST", path + "/batch", {"items": [payload] * args.batch_size}
+    return ENDPOINTS[args.endpoint]
+
+
+def worker(url, method, path, payload, stop_at, lat, codes, lock):
+    u = urlparse(url)
+    conn = http.client.HTTPConnection(u.hostname, u.port, timeout=60)
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+    local_lat, local_codes = [], collections.Counter()
+    while time.perf_counter() < stop_at:
+        t = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(u.hostname, u.port, timeout=60)
+            status = "conn_error"
+        local_lat.append(time.perf_counter() - t)
+        local_codes[status] += 1
+        if status == 429:
+            time.sleep(0.01)  # clients are expected to back off
+    conn.close()
+    with lock:
+        lat.extend(local_lat)
+        codes.update(local_codes)
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--url", help="existing server; default starts one with stub services")
+    ap.add_argument("--endpoint", choices=[*ENDPOINTS, "batch"], default="coverage")
+    ap.add_argument("--batch-size", type=int, default=16)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--service-ms", type=float, default=20.0, help="stub service latency")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--queue", type=int, default=32)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+
+    server, url = (None, args.url) if args.url else start_local(args)
+    method, path, payload = _request_for(args)
+
+    lat, codes, lock = [], collections.Counter(), threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(url, method, path, payload, stop_at, lat, codes, lock))
+               for _ in range(args.concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    if server is not None:
+        server.shutdown()
+
+    ok = codes.get(200, 0)
+    ms = [x * 1000 for x in lat]
+    print(f"{method} {path} x{args.concurrency} connections for {elapsed:.1f}s against {url}")
+    print(f"requests/sec {len(lat) / elapsed:10.1f}   (2xx/sec {ok / elapsed:.1f})")
+    if args.endpoint == "batch":
+        print(f"items/sec    {ok * args.batch_size / elapsed:10.1f}")
+    print(f"latency ms   p50 {pct(ms, 50):.2f}  p90 {pct(ms, 90):.2f}  p99 {pct(ms, 99):.2f}  max {max(ms):.2f}")
+    print("status       " + "  ".join(f"{k}:{v}" for k, v in sorted(codes.items(), key=str)))
+
+
+if __name__ == "__main__":
+    main()
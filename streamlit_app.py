@@ -4,7 +4,10 @@ import inspect
 import streamlit as st
 from dotenv import load_dotenv
 
+from app import telemetry
 from app.services.customers import get_customer
+from app.services.customer_search import resolve_customer_id, search_customers
+from app.services.policy_cache import pin_policy
 import app.services.rag as rag              # import the module (safer for optional helpers)
 from app.services.claims import evaluate_claim
 from app.vectorstore import chat_client     # for simple intent routing & chitchat
@@ -44,9 +47,11 @@ def _init_state():
             "content": "Hi! I’m HomeShield. Ask about your coverage — e.g., “Does my policy cover AC repair?”",
         }]
     st.session_state.setdefault("customer_id", "")
+    st.session_state.setdefault("customer_query", "")
     st.session_state.setdefault("last_issue", "")   # memory: last resolved coverage question
     st.session_state.setdefault("last_docs", [])
     st.session_state.setdefault("policy_source", None)
+    st.session_state.setdefault("pinned_policy", None)  # customer's policy, embedded once
 
 def _pill(label: str, value: str):
     st.markdown(f'<span class="hs-chip"><b>{label}:</b> {value}</span>', unsafe_allow_html=True)
@@ -80,6 +85,17 @@ def _load_customer(cid: str):
     except Exception:
         return None
 
+def _find_customers(query: str, k: int = 8):
+    try:
+        return search_customers(query, k=k)
+    except Exception:
+        return []
+
+def _choose_customer(hits):
+    labels = [f'{h["id"]} · {h["name"]} · {h["email"]}' for h in hits]
+    choice = st.selectbox("Matching customers", labels, index=None, placeholder="Choose a customer…")
+    return labels.index(choice) if choice else None
+
 def _route_intent(user_msg: str, history) -> str:
     """
     Returns: coverage | clarification | claim_process | chitchat | not_sure
@@ -99,9 +115,12 @@ def _route_intent(user_msg: str, history) -> str:
         "- not_sure: anything else"
     )
     user = f"History:\n{hist}\n\nLatest:\n{user_msg}"
-    out = llm.invoke(
-        [{"role": "system", "content": sys}, {"role": "user", "content": user}]
-    ).content.strip().lower()
+    with telemetry.span("llm.route_intent") as sp:
+        resp = llm.invoke(
+            [{"role": "system", "content": sys}, {"role": "user", "content": user}]
+        )
+        sp.record_usage(resp)
+    out = resp.content.strip().lower()
     if "clarification" in out: return "clarification"
     if "claim_process" in out: return "claim_process"
     if "coverage" in out: return "coverage"
@@ -114,9 +133,12 @@ def _answer_chitchat(user_msg: str) -> str:
         "You are a friendly, concise HomeShield concierge. Respond in 1–2 sentences. "
         "If the user asked a policy question, do not decide coverage; invite them to ask specifically."
     )
-    return llm.invoke(
-        [{"role": "system", "content": sys}, {"role": "user", "content": user_msg}]
-    ).content.strip()
+    with telemetry.span("llm.chitchat") as sp:
+        resp = llm.invoke(
+            [{"role": "system", "content": sys}, {"role": "user", "content": user_msg}]
+        )
+        sp.record_usage(resp)
+    return resp.content.strip()
 
 # Optional helpers from rag (present in newer versions)
 rewrite_to_standalone = getattr(rag, "rewrite_to_standalone", None)
@@ -135,17 +157,41 @@ with st.container():
             st.rerun()
 
 # ---------------------------- Customer context --------------------------------
-cid = st.text_input("Customer ID", value=st.session_state.get("customer_id", ""), placeholder="e.g., CXXXXX")
+cust_query = st.text_input(
+    "Customer",
+    key="customer_query",  # what was typed; customer_id holds the resolved ID
+    placeholder="ID, name or email, e.g., CXXXXX or garcia",
+)
+
+# type-ahead: unless the input is already an exact ID, nothing loads
+# until the agent picks one of the matches
+cid = resolve_customer_id(
+    cust_query, _find_customers(cust_query.strip()) if cust_query.strip() else [], _choose_customer
+)
 cust = None
-if cid.strip():
+if cid:
     cust = _load_customer(cid)
-    st.session_state["customer_id"] = cid
+if st.session_state.get("customer_id") != cid:
+    # never carry one customer's policy over to the next
+    st.session_state["pinned_policy"] = None
+    st.session_state["policy_source"] = None
+st.session_state["customer_id"] = cid
 
 # Store the policy source (doc filename) for retrieval filtering
 if cust:
     policy_src = os.path.basename(str(cust.get("policy_doc") or cust.get("policy_file") or ""))
     st.session_state["policy_source"] = policy_src if policy_src else None
 
+    # Pin the customer's policy so later turns rank it locally
+    pinned = st.session_state.get("pinned_policy")
+    if policy_src and (pinned is None or pinned.policy_file != policy_src):
+        try:
+            st.session_state["pinned_policy"] = pin_policy(
+                policy_src, cust["plan"], cust["state"], cust.get("effective_year")
+            )
+        except Exception:
+            st.session_state["pinned_policy"] = None  # remote retrieval still works
+
 if cust:
     chip_cols = st.columns([1, 1, 1, 3])
     with chip_cols[0]:
@@ -163,7 +209,8 @@ if cust:
         if st.session_state.get("policy_source"):
             _pill("Doc", st.session_state["policy_source"])
 else:
-    st.markdown('<div class="hs-muted">Enter a valid Customer ID to load plan/state/year.</div>', unsafe_allow_html=True)
+    st.markdown('<div class="hs-muted">Enter a Customer ID, or a name or email and choose the customer, '
+                'to load plan/state/year.</div>', unsafe_allow_html=True)
 
 st.divider()
 
@@ -186,67 +233,74 @@ if prompt:
             st.warning(msg)
             st.session_state.messages.append({"role": "assistant", "content": msg})
         else:
-            try:
-                intent = _route_intent(prompt, st.session_state.messages)
-
-                if intent == "chitchat":
-                    ans = _answer_chitchat(prompt)
-                    st.markdown(ans)
-                    st.session_state.messages.append({"role": "assistant", "content": ans})
-
-                elif intent == "claim_process" and callable(answer_claim_process):
-                    # Dedicated answer for claim process (if available in rag)
-                    ans, docs = answer_claim_process(
-                        prompt,
-                        cust["plan"],
-                        cust["state"],
-                        cust.get("effective_year")
-                    )
-                    st.markdown(ans)
-                    meta = {"citations": rag.format_citations(docs)}
-                    st.session_state.messages.append({"role": "assistant", "content": ans, "meta": meta})
-                    _render_citations(docs)
-
-                else:
-                    # coverage / clarification / not_sure -> rewrite with memory (if helper available)
-                    if callable(rewrite_to_standalone):
-                        resolved_q = rewrite_to_standalone(
-                            user_msg=prompt,
-                            history=st.session_state.messages,
-                            plan=cust["plan"],
-                            state=cust["state"],
-                            year=cust.get("effective_year"),
-                            last_issue=st.session_state.get("last_issue") or "",
-                        )
-                    else:
-                        resolved_q = prompt  # fallback
-
-                    docs = rag.retrieve_chunks(
-                        resolved_q,
-                        cust["plan"],
-                        cust["state"],
-                        cust.get("effective_year"),
-                        policy_source=st.session_state.get("policy_source")  # <<--- IMPORTANT
-                    )
-
-                    if not docs:
-                        msg = "I couldn't find policy text for that under your plan/state/year."
-                        st.error(msg)
-                        st.session_state.messages.append({"role": "assistant", "content": msg})
-                    else:
-                        ans = rag.answer_with_context(resolved_q, docs)
+            with telemetry.request("chat_turn", customer=cust.get("id")):
+                try:
+                    intent = _route_intent(prompt, st.session_state.messages)
+
+                    if intent == "chitchat":
+                        ans = _answer_chitchat(prompt)
+                        st.markdown(ans)
+                        st.session_state.messages.append({"role": "assistant", "content": ans})
+
+                    elif intent == "claim_process" and callable(answer_claim_process):
+                        # Dedicated answer for claim process (if available in rag)
+                        with telemetry.span("claim_process"):
+                            ans, docs = answer_claim_process(
+                                prompt,
+                                cust["plan"],
+                                cust["state"],
+                                cust.get("effective_year")
+                            )
                         st.markdown(ans)
                         meta = {"citations": rag.format_citations(docs)}
                         st.session_state.messages.append({"role": "assistant", "content": ans, "meta": meta})
                         _render_citations(docs)
-                        # remember the resolved issue
-                        st.session_state["last_issue"] = resolved_q
-                        st.session_state["last_docs"] = meta["citations"]
-
-            except Exception as e:
-                err = f"Sorry — I couldn't complete that. {e}"
-                st.error(err)
-                st.session_state.messages.append({"role": "assistant", "content": err})
+
+                    else:
+                        # coverage / clarification / not_sure -> rewrite with memory (if helper available)
+                        if callable(rewrite_to_standalone):
+                            with telemetry.span("llm.rewrite"):
+                                resolved_q = rewrite_to_standalone(
+                                    user_msg=prompt,
+                                    history=st.session_state.messages,
+                                    plan=cust["plan"],
+                                    state=cust["state"],
+                                    year=cust.get("effective_year"),
+                                    last_issue=st.session_state.get("last_issue") or "",
+                                )
+                        else:
+                            resolved_q = prompt  # fallback
+
+                        pinned = st.session_state.get("pinned_policy")
+                        if pinned is not None:
+                            docs = pinned.retrieve(resolved_q)
+                        else:
+                            docs = rag.retrieve_chunks(
+                                resolved_q,
+                                cust["plan"],
+                                cust["state"],
+                                cust.get("effective_year"),
+                                policy_source=st.session_state.get("policy_source")  # <<--- IMPORTANT
+                            )
+
+                        if not docs:
+                            msg = "I couldn't find policy text for that under your plan/state/year."
+                            st.error(msg)
+                            st.session_state.messages.append({"role": "assistant", "content": msg})
+                        else:
+                            ans = rag.answer_with_context(resolved_q, docs)
+                            st.markdown(ans)
+                            meta = {"citations": rag.format_citations(docs)}
+                            st.session_state.messages.append({"role": "assistant", "content": ans, "meta": meta})
+                            _render_citations(docs)
+                            # remember the resolved issue
+                            st.session_state["last_issue"] = resolved_q
+                            st.session_state["last_docs"] = meta["citations"]
+
+                except Exception as e:
+                    err = f"Sorry — I couldn't complete that. {e}"
+                    st.error(err)
+                    st.session_state.messages.append({"role": "assistant", "content": err})
 
 # -------------------- Optional quick adjudication (button) --------------------
 with st.expander("⚖️  Quick evaluate a specific issue (yes/no with reason)", expanded=False):
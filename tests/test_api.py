@@ -0,0 +1,105 @@
+import http.client
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+
+from app.api.main import create_app, make_server
+from app.services.customers import CustomerNotFound
+
+SCOPE = {"plan": "Gold", "state": "TX", "effective_year": 2025}
+
+
+def _services(**overrides):
+    def get_customer(cid):
+        if cid != "C00042":
+            raise CustomerNotFound("Customer not found")
+        return {"id": cid, "plan": "Gold", "state": "TX", "effective_year": 2025, "policy_file": None}
+
+    svc = {
+        "check_coverage": lambda *a, **kw: {"status": "likely_covered"},
+        "evaluate_claim": lambda *a, **kw: {"covered": True},
+        "retrieve_chunks": lambda *a, **kw: [],
+        "get_customer": get_customer,
+        "suggest_alternative_plans": lambda *a, **kw: [],
+    }
+    svc.update(overrides)
+    return svc
+
+
+def _client(**overrides):
+    app = create_app(_services(**overrides), workers=2, queue=2, timeout_s=5)
+    return app, app.test_client()
+
+
+def test_unknown_customer_is_404():
+    _, client = _client()
+    assert client.get("/customers/C00042").status_code == 200
+    resp = client.get("/customers/NOPE")
+    assert resp.status_code == 404
+    assert resp.get_json() == {"error": "Customer not found"}
+
+
+def test_server_faults_are_500_not_client_errors():
+    def missing_key(*a, **kw):
+        raise KeyError("AZURE_OPENAI_API_KEY")
+
+    def bad_value(*a, **kw):
+        raise ValueError("bad model output")
+
+    _, client = _client(check_coverage=missing_key, evaluate_claim=bad_value)
+    resp = client.post("/coverage/query", json={**SCOPE, "question": "Is my water heater covered?"})
+    assert resp.status_code == 500
+    resp = client.post("/claims/evaluate", json={**SCOPE, "issue_description": "compressor failed"})
+    assert resp.status_code == 500
+
+
+def test_invalid_payload_is_400():
+    _, client = _client()
+    assert client.post("/coverage/query", json={"question": "covered?"}).status_code == 400
+    assert client.post("/coverage/query", json={**SCOPE, "question": "q", "k": 0}).status_code == 400
+
+
+def test_batch_checks_shape_before_size():
+    _, client = _client()
+    for payload in ({"items": "abc"}, {"items": {"a": 1}}, {"items": []}, ["not", "an", "object"]):
+        assert client.post("/coverage/query/batch", json=payload).status_code == 400
+    # capped at pool capacity (2 workers + 2 queued)
+    items = [{**SCOPE, "question": "q"}] * 5
+    assert client.post("/coverage/query/batch", json={"items": items}).status_code == 413
+    resp = client.post("/customers/batch", json={"ids": ["C00042", "NOPE"]})
+    assert resp.get_json()["results"][1]["status"] == 404
+
+
+def test_server_refuses_connections_past_the_limit():
+    app, _ = _client()
+    server = make_server(app, "127.0.0.1", 0, max_connections=1, read_timeout_s=5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        # a client stalled mid-request holds the only slot
+        stalled = socket.create_connection(("127.0.0.1", server.server_port), timeout=5)
+        stalled.sendall(b"GET /healthz HTTP/1.1\r\n")
+        time.sleep(0.2)
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+        conn.request("GET", "/healthz")
+        resp = conn.getresponse()
+        assert resp.status == 429
+        assert resp.getheader("Retry-After") == "1"
+        stalled.sendall(b"Host: localhost\r\n\r\n")
+        assert stalled.recv(64).startswith(b"HTTP/1.1 200")
+        stalled.close()
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+        for _ in range(50):  # the slot frees once the response is sent
+            conn.request("GET", "/healthz")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                break
+            time.sleep(0.02)
+        assert resp.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import chunkstore
+from app.chunkstore import ChunkStore, MissingChunks
+from app.services import rag
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ChunkStore(tmp_path / "chunks.sqlite3", cache_size=2)
+    yield s
+    s.close()
+
+
+def _match(chunk_id, score=0.5, **meta):
+    return SimpleNamespace(id=f"hs-{chunk_id}", score=score, metadata={"chunk_id": chunk_id, **meta})
+
+
+def test_put_and_get_many(store):
+    assert store.put_many([("a", "alpha", "p.txt"), ("b", "beta", "p.txt")]) == 2
+    assert len(store) == 2
+    assert store.get_many(["a", "b", "zz"]) == {"a": "alpha", "b": "beta"}
+    assert store.absent == 1
+
+
+def test_cache_hits_and_eviction(store):
+    store.put_many([("a", "alpha", None), ("b", "beta", None), ("c", "gamma", None)])
+    store.get_many(["a", "b"])
+    assert (store.hits, store.misses) == (0, 2)
+    store.get_many(["a"])
+    assert store.hits == 1
+    store.get_many(["c"])  # cache holds 2, 'b' is the oldest
+    store.get_many(["b"])
+    assert store.misses == 4
+
+
+def test_put_replaces_cached_text(store):
+    store.put_many([("a", "old", None)])
+    store.get_many(["a"])
+    store.put_many([("a", "new", None)])
+    assert store.get_many(["a"]) == {"a": "new"}
+
+
+def test_get_many_batches_past_the_parameter_limit(store, monkeypatch):
+    monkeypatch.setattr(chunkstore, "_MAX_PARAMS", 3)
+    store.cache_size = 0
+    store.put_many((f"c{i}", f"t{i}", None) for i in range(10))
+    assert len(store.get_many(f"c{i}" for i in range(10))) == 10
+
+
+def test_to_documents_reads_text_from_the_store(store, monkeypatch):
+    store.put_many([("a", "alpha", "p.txt")])
+    monkeypatch.setattr(rag, "chunk_store", lambda: store)
+    docs = rag._to_documents([_match("a", source="p.txt"), _match("legacy", text="inline")])
+    assert [d.page_content for d in docs] == ["alpha", "inline"]
+    assert docs[0].metadata["source"] == "p.txt"
+
+
+def test_to_documents_drops_a_partial_miss_and_logs_it(store, monkeypatch, caplog):
+    store.put_many([("a", "alpha", None)])
+    monkeypatch.setattr(rag, "chunk_store", lambda: store)
+    pairs = rag._to_documents([_match("a", 0.9), _match("gone", 0.8)], with_scores=True)
+    assert [(d.page_content, s) for d, s in pairs] == [("alpha", 0.9)]
+    assert "gone" in caplog.text
+
+
+def test_to_documents_raises_when_no_chunk_is_in_the_store(store, monkeypatch):
+    monkeypatch.setattr(rag, "chunk_store", lambda: store)
+    with pytest.raises(MissingChunks, match="HOMESHIELD_CHUNK_STORE"):
+        rag._to_documents([_match("gone"), _match("also-gone")])
+    assert rag._to_documents([]) == []
@@ -0,0 +1,91 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services import customer_search  # noqa: E402
+from app.services.customer_search import CustomerIndex, resolve_customer_id  # noqa: E402
+
+ROWS = [
+    ("C00001", "Morgan", "Lewis", "user1@example.com"),
+    ("C00002", "Jordan", "Garcia", "user2@example.com"),
+    ("C00010", "Maria", "Garcia", "maria.g@example.com"),
+    ("C00011", "Jordan", "Garciaparra", "jg@example.com"),
+    ("C00100", "Taylor", "Nguyen", "tnguyen@example.com"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CustomerIndex(
+        {"customer_id": i, "first_name": f, "last_name": l, "email": e} for i, f, l, e in ROWS
+    )
+
+
+def test_exact_id_ranks_first(index):
+    hits = index.search("c00010")
+    assert hits[0] == {"id": "C00010", "name": "Maria Garcia", "email": "maria.g@example.com",
+                       "score": 1.0, "match": "id"}
+    assert all(h["score"] < 1.0 for h in hits[1:])
+
+
+def test_id_prefix(index):
+    assert [h["id"] for h in index.search("C0001")] == ["C00010", "C00011"]
+
+
+def test_email_prefix(index):
+    hits = index.search("tng")
+    assert hits[0]["id"] == "C00100" and hits[0]["match"] == "email"
+
+
+def test_full_name_outranks_a_longer_name(index):
+    hits = index.search("garcia")
+    assert [h["id"] for h in hits] == ["C00002", "C00010", "C00011"]
+    assert hits[0]["score"] > hits[2]["score"]
+
+
+def test_first_and_last_name_narrow_the_match(index):
+    assert [h["id"] for h in index.search("jordan garcia")][:1] == ["C00002"]
+    assert [h["id"] for h in index.search("maria garc")] == ["C00010"]
+
+
+def test_typo_matches_by_trigrams(index):
+    hits = index.search("nguyem")
+    assert [h["id"] for h in hits] == ["C00100"]
+    assert hits[0]["match"] == "name" and hits[0]["score"] < 0.85
+
+
+def test_no_match(index):
+    assert index.search("zzzz") == []
+    assert index.search("C99") == []
+    assert index.search("   ") == []
+    assert index.search("garcia", k=0) == []
+
+
+def test_customer_index_rebuilds_when_the_csv_changes(tmp_path, monkeypatch):
+    path = tmp_path / "customers.csv"
+    path.write_text("customer_id,first_name,last_name,email\nC00001,Morgan,Lewis,m@example.com\n",
+                    encoding="utf-8")
+    monkeypatch.setenv("CUSTOMERS_CSV", str(path))
+    monkeypatch.setattr(customer_search, "_index", None)
+    assert customer_search.search_customers("lewis")[0]["id"] == "C00001"
+
+    path.write_text("customer_id,first_name,last_name,email\nC00002,Jordan,Lewis,j@example.com\n",
+                    encoding="utf-8")
+    monkeypatch.setattr(customer_search, "_index_key", None)  # mtime can repeat within a tick
+    assert customer_search.search_customers("lewis")[0]["id"] == "C00002"
+
+
+def _never(hits):
+    raise AssertionError("asked to choose")
+
+
+def test_nothing_loads_until_a_match_is_picked(index):
+    hits = index.search("garcia")
+    assert resolve_customer_id("garcia", hits, lambda h: None) == ""
+    assert resolve_customer_id("garcia", hits, lambda h: 1) == "C00010"
+
+
+def test_exact_id_or_unmatched_text_loads_as_typed(index):
+    assert resolve_customer_id(" c00002 ", index.search("c00002"), _never) == "c00002"
+    assert resolve_customer_id("C77777", index.search("C77777"), _never) == "C77777"
+    assert resolve_customer_id("", [], _never) == ""
@@ -0,0 +1,189 @@
+from app.services import plan_diffs
+from app.services.plan_diffs import _plan_verdict, evaluate_from_table, match_topics, parse_policy
+
+CLAUSE = ("is covered for mechanical and electrical failures under the {plan} plan, subject to exclusions "
+          "listed below. Pre-existing conditions and improper installation are excluded. Wear items "
+          "(e.g., filters, belts) are excluded unless otherwise stated.")
+
+
+def _policy(tmp_path, plan="Silver", labor="No", roof="covered"):
+    lines = [
+        f"Liberty Home Guard – {plan} Plan – CA – 2025",
+        "",
+        "SECTION 2 – COVERAGE SUMMARY",
+        "- Parts Covered: Yes",
+        f"- Labor Covered: {labor}",
+        "- Per-Claim Limit: $1500",
+        "- Service Fee (Deductible): $85 per service request",
+        "",
+        "SECTION – HVAC",
+        "- Compressor " + CLAUSE.format(plan=plan),
+        "- Blower Motor " + CLAUSE.format(plan=plan),
+        "",
+        "SECTION – KITCHEN APPLIANCES",
+        "- Range/Oven " + CLAUSE.format(plan=plan),
+        "",
+        "SECTION – PLUMBING",
+        "- Water Heater " + CLAUSE.format(plan=plan),
+        "",
+        "SECTION – LAUNDRY",
+        "- Dryer " + CLAUSE.format(plan=plan),
+        "- Drive Belt " + CLAUSE.format(plan=plan),
+        "- Motor " + CLAUSE.format(plan=plan),
+        "",
+        "SECTION – ROOF",
+        f"- Leaks is {roof} under the {plan} plan.",
+        "",
+        "SECTION – EXCLUSIONS",
+        "- Cosmetic damage, rust, corrosion beyond normal wear",
+        "- Acts of God, abuse, neglect, or lack of maintenance",
+        "",
+        "SECTION – LIMITS AND DEDUCTIBLES",
+        "Combined annual limit is $9000.",
+    ]
+    path = tmp_path / f"LHG_{plan}_CA_2025.txt"
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+def _table(tmp_path):
+    _policy(tmp_path, "Silver", labor="No", roof="not covered")
+    _policy(tmp_path, "Gold", labor="Yes")
+    return plan_diffs.build_plan_table(tmp_path)
+
+
+def test_parse_policy_reads_terms_components_and_exclusions(tmp_path):
+    p = parse_policy(_policy(tmp_path))
+    assert (p["plan"], p["state"], p["year"]) == ("Silver", "CA", 2025)
+    assert p["terms"]["labor_covered"][0] is False
+    assert p["terms"]["annual_limit"][0] == "$9000"
+    assert p["components"]["compressor"][:3] == [True, "Compressor", "HVAC"]
+    assert {kw for kw, _, _ in p["exclusions"]} >= {"cosmetic damage", "rust", "acts of god", "lack of maintenance"}
+
+
+def test_parse_policy_reads_exclusions_inside_component_clauses(tmp_path):
+    p = parse_policy(_policy(tmp_path))
+    compressor = {kw for kw, _ in p["components"]["compressor"][5]}
+    assert compressor == {"pre-existing", "improper installation", "wear items", "filters", "belts"}
+    # the Drive Belt clause is what 'unless otherwise stated' refers to
+    assert "belts" not in {kw for kw, _ in p["components"]["drive belt"][5]}
+
+
+def test_parse_policy_ignores_other_files(tmp_path):
+    other = tmp_path / "notes.txt"
+    other.write_text("- Compressor is covered", encoding="utf-8")
+    assert parse_policy(other) is None
+
+
+def test_match_topics_components_terms_and_clause_exclusions(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    t = match_topics("AC compressor failed due to improper installation, is labor covered?", entry)
+    assert t["components"] == ["compressor"]
+    assert t["terms"] == ["labor_covered"]
+    assert t["clause_exclusions"] == ["improper installation"]
+    assert t["causes"] == []
+
+
+def test_match_topics_prefers_longer_component_and_skips_its_words(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    t = match_topics("dryer drive belt snapped", entry)
+    assert sorted(t["components"]) == ["drive belt", "dryer"]
+    assert t["clause_exclusions"] == []
+
+
+def test_match_topics_range_hood_is_not_range_oven(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    assert match_topics("range hood fan is broken", entry)["components"] == []
+    assert match_topics("oven won't heat", entry)["components"] == ["range/oven"]
+    assert match_topics("range hood is fine but the oven won't heat", entry)["components"] == ["range/oven"]
+
+
+def test_match_topics_reports_causes_it_cannot_classify(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    assert match_topics("compressor died due to a power surge", entry)["causes"]
+    assert match_topics("roof leaks after the storm", entry)["causes"] == ["storm"]
+    assert match_topics("compressor failed due to an electrical failure", entry)["causes"] == []
+
+
+def test_match_topics_negated_exclusion(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    assert match_topics("compressor failed, not pre-existing", entry)["clause_exclusions"] == []
+
+
+def test_plan_verdict_covered_component(tmp_path):
+    table = _table(tmp_path)
+    gold = table["plans"]["CA|2025"]["Gold"]
+    topics = match_topics("compressor stopped working", gold)
+    v = _plan_verdict(topics, gold, None, table["texts"])
+    assert v["covered"] is True
+    assert v["reason"] == "Compressor is covered (HVAC)."
+    assert "Compressor is covered" in v["citations"][0]["text"]
+
+
+def test_plan_verdict_clause_exclusion_denies(tmp_path):
+    table = _table(tmp_path)
+    gold = table["plans"]["CA|2025"]["Gold"]
+    topics = match_topics("AC compressor failed due to improper installation", gold)
+    v = _plan_verdict(topics, gold, None, table["texts"])
+    assert v["covered"] is False
+    assert v["reason"] == "The Compressor clause excludes improper installation."
+    assert "improper installation are excluded" in v["citations"][0]["text"]
+
+
+def test_plan_verdict_section_labels_keep_case(tmp_path):
+    table = _table(tmp_path)
+    plans = table["plans"]["CA|2025"]
+    silver, gold = plans["Silver"], plans["Gold"]
+    topics = match_topics("roof leaks", silver)
+    assert _plan_verdict(topics, gold, silver, table["texts"])["reason"] == "Leaks is covered (Roof)."
+    assert _plan_verdict(topics, silver, silver, table["texts"])["covered"] is False
+
+
+def test_plan_verdict_term_notes_current_value(tmp_path):
+    table = _table(tmp_path)
+    plans = table["plans"]["CA|2025"]
+    topics = match_topics("is labor covered", plans["Silver"])
+    v = _plan_verdict(topics, plans["Gold"], plans["Silver"], table["texts"])
+    assert v["covered"] is True
+    assert v["reason"] == "Labor Covered: Yes (yours: No)."
+
+
+def test_evaluate_from_table_falls_back_on_unclassified_cause(tmp_path):
+    table = _table(tmp_path)
+    assert evaluate_from_table("compressor failed due to a power surge", "Silver", "CA", 2025, table) is None
+    assert evaluate_from_table("something odd happened", "Silver", "CA", 2025, table) is None
+    out = evaluate_from_table("AC compressor failed due to improper installation", "Silver", "CA", 2025, table)
+    assert [(c["plan"], c["covered"]) for c in out] == [("Gold", False)]
+
+
+def test_match_topics_exclusions_match_by_stem(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    assert match_topics("my water heater rusted out", entry)["exclusions"] == ["rust"]
+    assert match_topics("cosmetic scratch on oven", entry)["exclusions"] == ["cosmetic damage"]
+    assert match_topics("an act of god", entry)["exclusions"] == ["acts of god"]
+    assert match_topics("compressor was improperly installed", entry)["clause_exclusions"] == ["improper installation"]
+    assert match_topics("water heater is not rusted", entry)["exclusions"] == []
+
+
+def test_match_topics_generic_component_needs_its_section(tmp_path):
+    entry = parse_policy(_policy(tmp_path))
+    assert match_topics("ceiling fan motor died", entry)["components"] == []
+    assert match_topics("drive belt snapped", entry)["components"] == []
+    assert sorted(match_topics("dryer motor died", entry)["components"]) == ["dryer", "motor"]
+    assert match_topics("laundry motor died", entry)["components"] == ["motor"]
+    # 'blower motor' is specific enough on its own
+    assert match_topics("blower motor died", entry)["components"] == ["blower motor"]
+
+
+def test_evaluate_from_table_exclusions_deny_every_plan(tmp_path):
+    table = _table(tmp_path)
+    for issue in ("my water heater rusted out", "cosmetic scratch on oven"):
+        out = evaluate_from_table(issue, "Silver", "CA", 2025, table)
+        assert [(c["plan"], c["covered"]) for c in out] == [("Gold", False)]
+
+
+def test_evaluate_from_table_falls_back_on_unlisted_appliance(tmp_path):
+    table = _table(tmp_path)
+    assert evaluate_from_table("ceiling fan motor died", "Silver", "CA", 2025, table) is None
+    assert evaluate_from_table("rusted ceiling fan, is labor covered?", "Silver", "CA", 2025, table) is None
+    assert evaluate_from_table("drive belt snapped", "Silver", "CA", 2025, table) is None
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from app.services import policy_cache, rag
+from app.services.ingestion import text_splitter
+from app.services.policy_cache import PinnedPolicy
+
+np = pytest.importorskip("numpy")
+
+
+def _pinned(plan="Silver", state="TX", year=2025):
+    return PinnedPolicy(f"LHG_{plan}_{state}_{year}.txt", plan, state, year, [], np.zeros((0, 4)))
+
+
+@pytest.mark.parametrize("question", [
+    "will my premium go up?",
+    "I have a gold-plated faucet that leaks",
+    "my diamond ring fell into the disposal",
+    "gold coverage for my water heater",
+    "Does the Silver plan cover labor?",
+])
+def test_remote_plan_stays_local_for_ordinary_wording(question):
+    assert _pinned().remote_plan(question) is None
+
+
+@pytest.mark.parametrize("question, plan", [
+    ("Does the Gold plan cover labor?", "Gold"),
+    ("how does the platinum tier differ?", "Platinum"),
+    ("should I upgrade to gold", "Gold"),
+    ("is Platinum better than mine?", "Platinum"),
+])
+def test_remote_plan_for_another_plan(question, plan):
+    assert _pinned().remote_plan(question) == plan
+
+
+def test_remote_plan_only_offers_plans_with_a_policy():
+    # no Diamond or Premium policies exist for any state
+    assert _pinned().remote_plan("should I upgrade to the Diamond plan?") is None
+    assert _pinned(year=None).remote_plan("Does the Gold plan cover labor?") is None
+
+
+class _Embeddings:
+    def embed_documents(self, texts):
+        return [[1.0, float(len(t))] for t in texts]
+
+
+def test_pinned_chunks_are_numbered_like_ingestion(tmp_path, monkeypatch):
+    clause = "- Compressor is covered for mechanical and electrical failures. " * 40
+    for plan in ("Gold", "Silver"):
+        (tmp_path / f"LHG_{plan}_TX_2025.txt").write_text(clause, encoding="utf-8")
+    monkeypatch.setattr(rag, "embeddings", lambda: _Embeddings())
+    monkeypatch.setattr(policy_cache, "_offsets", None)
+
+    # ingestion splits every file in glob order and numbers chunks across them
+    expected, i = {}, 0
+    for p in Path(tmp_path).glob("*.txt"):
+        for _ in text_splitter().split_text(p.read_text(encoding="utf-8")):
+            expected.setdefault(p.name, []).append(f"{p.name}-{i:04d}")
+            i += 1
+
+    for name, ids in expected.items():
+        pinned = policy_cache._build(tmp_path / name, "Gold", "TX", 2025)
+        assert [d.metadata["chunk_id"] for d in pinned.docs] == ids
+        first = int(ids[0].rsplit("-", 1)[1])
+        assert pinned.docs[0].metadata["page"] == first // 5 + 1
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rag
+from app.services.rag import choose_k
+
+
+def test_choose_k_empty():
+    assert choose_k([], 8) == (0, 0.0)
+
+
+def test_choose_k_keeps_the_top_min_k_under_the_floor():
+    n, _ = choose_k([0.29, 0.2], 8, k_min=2, min_score=0.3)
+    assert n == 2
+    assert choose_k([0.29, 0.2, 0.1], 8, k_min=2, min_score=0.3)[0] == 2
+    assert choose_k([0.29], 8, k_min=2, min_score=0.3)[0] == 1
+
+
+def test_choose_k_drops_scores_under_the_floor_past_min_k():
+    n, gap = choose_k([0.8, 0.79, 0.78, 0.2, 0.1], 8, k_min=2, min_score=0.3, min_gap=0.5)
+    assert n == 3
+    assert gap == pytest.approx(0.58)
+
+
+def test_choose_k_cuts_at_the_largest_gap():
+    n, gap = choose_k([0.9, 0.88, 0.87, 0.6, 0.58, 0.57], 8, k_min=2, min_score=0.3, min_gap=0.04)
+    assert n == 3
+    assert gap == pytest.approx(0.27)
+    # a drop under min_gap doesn't cut
+    assert choose_k([0.9, 0.89, 0.88, 0.87], 8, k_min=2, min_score=0.3, min_gap=0.04) == (4, 0.0)
+    # a drop ahead of the k_min-th score can't cut
+    assert choose_k([0.9, 0.5, 0.49, 0.48], 8, k_min=2, min_score=0.3, min_gap=0.04)[0] == 4
+
+
+def test_choose_k_caps_at_k_max():
+    assert choose_k([0.9] * 10, 4, k_min=2, min_score=0.3) == (4, 0.0)
+
+
+def _matches(scores):
+    return [SimpleNamespace(id=f"hs-{i}", score=s, values=[1.0, float(i)],
+                            metadata={"chunk_id": f"c{i}", "text": f"chunk {i}"})
+            for i, s in enumerate(scores)]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    calls = []
+
+    def search(vec, top_k, meta_filter, include_values=True):
+        calls.append(top_k)
+        return index.matches[:top_k]
+
+    monkeypatch.setattr(rag, "_embed_query", lambda q: [1.0, 0.0])
+    monkeypatch.setattr(rag, "_search", search)
+    monkeypatch.setattr(rag, "MIN_SCORE", 0.3)
+    monkeypatch.setattr(rag, "MIN_K", 2)
+    monkeypatch.setattr(rag, "SCORE_GAP", 0.04)
+    monkeypatch.setattr(rag, "CLEAR_MARGIN", 0.08)
+    index.calls = calls
+    return index
+
+
+def test_first_pass_stops_on_a_clear_margin(index):
+    index.matches = _matches([0.9, 0.88, 0.5, 0.49, 0.48])
+    pairs = rag._retrieve_scored("q", "Gold", "TX", 2025, 8, None, True)
+    assert [s for _, s in pairs] == [0.9, 0.88]
+    assert index.calls == [8]
+
+
+def test_first_pass_without_a_clear_margin_runs_the_full_search(index):
+    index.matches = _matches([0.9 - 0.01 * i for i in range(12)])
+    pairs = rag._retrieve_scored("q", "Gold", "TX", 2025, 8, None, True)
+    assert index.calls == [8, rag.FETCH_K]
+    scores = [s for _, s in pairs]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_weak_matches_still_give_context(index):
+    index.matches = _matches([0.29, 0.2, 0.1])
+    pairs = rag._retrieve_scored("q", "Gold", "TX", 2025, 8, None, False)
+    assert [s for _, s in pairs] == [0.29, 0.2]
+
+
+def test_first_pass_stops_when_nothing_clears_the_floor(index):
+    index.matches = _matches([0.29, 0.28, 0.27, 0.26])
+    pairs = rag._retrieve_scored("q", "Gold", "TX", 2025, 8, None, True)
+    assert [s for _, s in pairs] == [0.29, 0.28]
+    assert index.calls == [8]
@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+from app import scheduler
+from app.batching import EmbeddingDispatcher
+from app.scheduler import DeadlineExceeded, Scheduler, Shed, current_priority, current_rank
+from app.singleflight import SingleFlight
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.t = 1000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _wait_until(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def test_higher_class_goes_first_when_a_slot_frees():
+    s = Scheduler("test", concurrency=1)
+    first = s.acquire(1)
+    order = []
+
+    def worker(cls):
+        t = s.acquire(1, cls=cls)
+        order.append(cls)
+        s.release(t)
+
+    threads = [threading.Thread(target=worker, args=("batch",))]
+    threads[0].start()
+    _wait_until(lambda: s.stats()["waiting"] == 1)
+    threads.append(threading.Thread(target=worker, args=("interactive",)))
+    threads[1].start()
+    _wait_until(lambda: s.stats()["waiting"] == 2)
+    s.release(first)
+    for t in threads:
+        t.join(2)
+    assert order == ["interactive", "batch"]
+
+
+def test_lower_classes_leave_the_reserve_for_interactive():
+    clock = Clock()
+    s = Scheduler("test", tpm=600, burst_s=10, clock=clock)  # bucket of 100 tokens, no refill
+    s.release(s.acquire(70, cls="background"), used=70)
+    # background keeps 20% back: 30 left, 20 more would leave 10
+    with pytest.raises(DeadlineExceeded):
+        s.acquire(20, cls="background", deadline=clock.t)
+    s.release(s.acquire(20, cls="interactive", deadline=clock.t), used=20)
+    assert s.stats()["background"]["expired"] == 1
+
+
+def test_background_is_shed_near_the_limit_but_interactive_is_not():
+    clock = Clock()
+    s = Scheduler("test", tpm=600, burst_s=10, clock=clock)
+    s.release(s.acquire(95, cls="interactive"), used=95)
+    with pytest.raises(Shed):
+        s.acquire(1, cls="background")
+    s.release(s.acquire(1, cls="interactive", deadline=clock.t))
+    assert s.stats()["background"]["shed"] == 1
+    clock.t += 10  # refilled
+    s.release(s.acquire(1, cls="background"))
+
+
+def test_class_comes_from_the_priority_context():
+    s = Scheduler("test")
+    with scheduler.priority("batch"):
+        t = s.acquire(1)
+        assert current_priority() == "batch"
+    assert t.cls.name == "batch"
+    s.release(t)
+    assert current_rank() < (1, "background")
+
+
+def test_shared_calls_stay_within_a_class():
+    flight = SingleFlight("t", scope=current_priority, rerun_on=scheduler.CALLER_ERRORS)
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def leader_fn():
+        started.set()
+        release.wait(2)
+        raise Shed("background shed")
+
+    def follower_fn():
+        seen.append(current_priority())
+        return "ok"
+
+    def leader():
+        with scheduler.priority("background"):
+            with pytest.raises(Shed):
+                flight.do("q", leader_fn)
+
+    t = threading.Thread(target=leader)
+    t.start()
+    started.wait(2)
+    assert flight.do("q", follower_fn) == "ok"  # interactive: its own call, not the background one
+    release.set()
+    t.join(2)
+    assert seen == ["interactive"]
+
+
+def test_follower_reruns_after_the_leaders_caller_error():
+    flight = SingleFlight("t", rerun_on=scheduler.CALLER_ERRORS)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            release.wait(2)
+            raise DeadlineExceeded("leader's deadline")
+        return "ok"
+
+    errors = []
+    t = threading.Thread(target=lambda: errors.append(pytest.raises(DeadlineExceeded, flight.do, "q", fn)))
+    t.start()
+    started.wait(2)
+    result = []
+    f = threading.Thread(target=lambda: result.append(flight.do("q", fn)))
+    f.start()
+    _wait_until(lambda: flight.stats()["shared"] == 1)
+    release.set()
+    t.join(2)
+    f.join(2)
+    assert result == ["ok"] and len(calls) == 2
+
+
+def test_dispatcher_batches_by_class_in_the_callers_context():
+    seen = []
+
+    def embed_documents(texts):
+        seen.append((current_priority(), sorted(texts)))
+        return [[float(len(t))] for t in texts]
+
+    d = EmbeddingDispatcher(embed_documents, max_batch=8, window_ms=50, group=current_rank)
+    try:
+        with scheduler.priority("batch"):
+            b = d.submit("bb")
+        i = d.submit("i")
+        assert i.result(2) == [1.0] and b.result(2) == [2.0]
+    finally:
+        d.close()
+    assert ("interactive", ["i"]) in seen and ("batch", ["bb"]) in seen
+    assert seen[0][0] == "interactive"
+
+
+def test_dispatcher_batch_does_not_inherit_one_callers_deadline():
+    sched = Scheduler("embed", concurrency=1)
+    busy = sched.acquire(0)  # the deployment is full until released
+    calls = []
+
+    def embed_documents(texts):
+        calls.append(sorted(texts))
+        return sched.run(lambda: [[float(len(t))] for t in texts])
+
+    d = EmbeddingDispatcher(embed_documents, max_batch=8, window_ms=50, group=current_rank,
+                            rerun_on=scheduler.CALLER_ERRORS)
+    try:
+        with scheduler.priority("interactive", timeout_s=0.05):
+            tight = d.submit("a")
+        with scheduler.priority("interactive", timeout_s=5):
+            loose = d.submit("bb")
+        with pytest.raises(DeadlineExceeded):
+            tight.result(2)
+        threading.Timer(0.1, sched.release, (busy,)).start()
+        assert loose.result(2) == [2.0]
+    finally:
+        d.close()
+    assert calls == [["a", "bb"], ["bb"]]
+    assert d.stats()["upstream_calls"] == 2
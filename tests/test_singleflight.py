@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_do_async_shares_one_call():
+    flight = SingleFlight("t")
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["ok"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+
+def test_cancelling_the_leader_does_not_cancel_followers():
+    flight = SingleFlight("t")
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_cancelling_a_follower_leaves_the_call_running():
+    flight = SingleFlight("t")
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", fn))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("t")
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", fn) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
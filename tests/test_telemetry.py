@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from app import telemetry
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    """Each test starts with the flags unread and no recorded spans."""
+    for var in ("HOMESHIELD_TRACE", "HOMESHIELD_TRACE_FILE", "HOMESHIELD_PROFILE_SAMPLE"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(telemetry, "_enabled", None)
+    monkeypatch.setattr(telemetry, "_jsonl_path", None)
+    monkeypatch.setattr(telemetry, "_profile_rate", None)
+    monkeypatch.setattr(telemetry, "_profile_hook", telemetry._dump_profile)
+    telemetry.reset()
+    yield
+    telemetry.reset()
+
+
+def test_disabled_spans_are_the_shared_noop():
+    telemetry.disable()
+    assert telemetry.span("retrieve", k=8) is telemetry._NOOP
+    assert telemetry.request("chat_turn") is telemetry._NOOP
+    with telemetry.request("chat_turn") as r, telemetry.span("llm.answer") as s:
+        s.set(chunks=3)
+        s.record_usage(object())
+        assert telemetry.current() is None
+    assert r is s is telemetry._NOOP
+    assert telemetry.recent_spans() == []
+
+
+def test_flags_are_read_on_first_use_not_at_import(monkeypatch, tmp_path):
+    out = tmp_path / "spans.jsonl"
+    # set after the module was imported, as loading .env does
+    monkeypatch.setenv("HOMESHIELD_TRACE", "1")
+    monkeypatch.setenv("HOMESHIELD_TRACE_FILE", str(out))
+    with telemetry.span("retrieve"):
+        pass
+    assert telemetry.is_enabled() is True
+    assert json.loads(out.read_text(encoding="utf-8"))["name"] == "retrieve"
+
+
+def test_flags_off_by_default():
+    assert telemetry.span("retrieve") is telemetry._NOOP
+    assert telemetry.is_enabled() is False
+
+
+def test_enable_keeps_the_trace_file_from_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOMESHIELD_TRACE_FILE", str(tmp_path / "spans.jsonl"))
+    telemetry.enable()
+    assert telemetry._jsonl_path == str(tmp_path / "spans.jsonl")
+
+
+def test_spans_nest_and_roll_up_tokens_and_stages():
+    telemetry.enable()
+    with telemetry.request("chat_turn", customer="C00042") as root:
+        with telemetry.span("retrieve", k=8) as sp:
+            sp.set(returned=5)
+            assert telemetry.current() is sp
+        with telemetry.span("llm.answer") as llm:
+            llm.add_tokens(100, 20)
+    assert sp.parent is root and llm.parent is root and root.parent is None
+    assert sp.trace_id == llm.trace_id == root.trace_id
+    assert (root.prompt_tokens, root.completion_tokens) == (100, 20)
+    assert set(root.stages) == {"retrieve", "llm.answer"}
+
+    inner, _, outer = telemetry.recent_spans()
+    assert inner["attrs"] == {"k": 8, "returned": 5}
+    assert inner["parent_id"] == outer["span_id"]
+    assert outer["attrs"] == {"customer": "C00042"}
+    assert outer["parent_id"] is None and "stages" in outer
+
+
+def test_errors_are_recorded_and_re_raised():
+    telemetry.enable()
+    with pytest.raises(ValueError):
+        with telemetry.span("vector.search"):
+            raise ValueError("boom")
+    assert telemetry.recent_spans()[-1]["error"] == "ValueError"
+    assert 'homeshield_stage_errors_total{stage="vector.search"} 1' in telemetry.render_prometheus()
+
+
+def test_record_usage_reads_langchain_usage():
+    class Resp:
+        usage_metadata = {"input_tokens": 7, "output_tokens": 3}
+
+    telemetry.enable()
+    with telemetry.span("llm.answer") as sp:
+        sp.record_usage(Resp())
+    assert (sp.prompt_tokens, sp.completion_tokens) == (7, 3)
+    text = telemetry.render_prometheus()
+    assert 'homeshield_tokens_total{stage="llm.answer",kind="prompt"} 7' in text
+    assert 'homeshield_stage_seconds_count{stage="llm.answer"} 1' in text
+
+
+def test_sampled_requests_run_the_profiler_hook():
+    seen = []
+    telemetry.enable()
+    telemetry.set_profiler_hook(lambda root, prof: seen.append(root.name), sample_rate=1.0)
+    with telemetry.request("chat_turn"):
+        with telemetry.request("nested"):  # only the root is profiled
+            pass
+    assert seen == ["chat_turn"]